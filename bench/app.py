@@ -6,6 +6,7 @@ import re
 import shutil
 import subprocess
 import sys
+import threading
 import typing
 from collections import OrderedDict
 from datetime import date
@@ -14,7 +15,6 @@ from urllib.parse import urlparse
 
 # imports - third party imports
 import click
-import git
 
 # imports - module imports
 import bench
@@ -29,7 +29,7 @@ from bench.utils import (
 	log,
 	run_frappe_cmd,
 )
-from bench.utils.bench import build_assets, install_python_dev_dependencies
+from bench.utils.bench import build_assets, install_python_dev_dependencies, yarn_install
 from bench.utils.render import step
 
 if typing.TYPE_CHECKING:
@@ -37,6 +37,10 @@ if typing.TYPE_CHECKING:
 
 
 logger = logging.getLogger(bench.PROJECT_NAME)
+# serializes the steps of concurrent app installs that change the bench's env
+# or apps.txt & apps.json
+env_lock = threading.RLock()
+CLONE_STRATEGY_FLAGS = {"full": "", "shallow": "--depth 1", "blobless": "--filter=blob:none"}
 
 
 class AppMeta:
@@ -107,6 +111,8 @@ class AppMeta:
 			self.app_name = self.repo
 
 	def _setup_details_from_mounted_disk(self):
+		import git
+
 		# If app is a git repo
 		self.git_repo = git.Repo(self.mount_path)
 		try:
@@ -177,12 +183,28 @@ class App(AppMeta):
 
 	@step(title="Fetching App {repo}", success="App {repo} Fetched")
 	def get(self):
+		from shlex import quote
+
+		from bench.utils.mirror import update_mirror
+
 		branch = f"--branch {self.tag}" if self.tag else ""
-		shallow = "--depth 1" if self.bench.shallow_clone else ""
+		clone_flags = CLONE_STRATEGY_FLAGS[self.bench.clone_strategy]
+		sparse_checkout_patterns = self.bench.conf.get("sparse_checkout_patterns")
+		mirror = None
 
 		if not self.soft_link:
+			mirror = update_mirror(self.url, bench_path=self.bench.name)
 			cmd = "git clone"
-			args = f"{self.url} {branch} {shallow} --origin upstream"
+			# clones from a local mirror hardlink its objects, so aren't made shallow
+			args = (
+				f"{mirror} {branch} --origin upstream"
+				if mirror
+				else f"{self.url} {branch} {clone_flags} --origin upstream"
+			)
+			if mirror or sparse_checkout_patterns:
+				args = f"{args} {self.repo}"
+			if sparse_checkout_patterns:
+				args = f"{args} --no-checkout"
 		else:
 			cmd = "ln -s"
 			args = f"{self.name}"
@@ -196,6 +218,19 @@ class App(AppMeta):
 			cwd=os.path.join(self.bench.name, "apps"),
 		)
 
+		if self.soft_link:
+			return
+
+		app_path = os.path.join(self.bench.name, "apps", self.repo)
+
+		if mirror:
+			self.bench.run(f"git remote set-url upstream {self.url}", cwd=app_path)
+
+		if sparse_checkout_patterns:
+			patterns = " ".join(quote(pattern) for pattern in sparse_checkout_patterns)
+			self.bench.run(f"git sparse-checkout set --no-cone {patterns}", cwd=app_path)
+			self.bench.run("git checkout", cwd=app_path)
+
 	@step(title="Archiving App {repo}", success="App {repo} Archived")
 	def remove(self, no_backup: bool = False):
 		active_app_path = os.path.join("apps", self.repo)
@@ -227,6 +262,8 @@ class App(AppMeta):
 		resolved=False,
 		restart_bench=True,
 		ignore_resolution=False,
+		skip_python=False,
+		skip_node=False,
 	):
 		import bench.cli
 		from bench.utils.app import get_app_name
@@ -247,6 +284,8 @@ class App(AppMeta):
 			skip_assets=skip_assets,
 			restart_bench=restart_bench,
 			resolution=self.local_resolution,
+			skip_python=skip_python,
+			skip_node=skip_node,
 		)
 
 	@step(title="Cloning and installing {repo}", success="App {repo} Installed")
@@ -259,19 +298,16 @@ class App(AppMeta):
 		self.bench.run(f"{self.bench.python} -m pip uninstall -y {self.name}")
 
 	def _get_dependencies(self):
-		from bench.utils.app import get_required_deps, required_apps_from_hooks
+		from bench.utils.app import get_required_apps, required_apps_from_hooks
 
 		if self.on_disk:
 			required_deps = os.path.join(self.mount_path, self.repo, "hooks.py")
 			try:
 				return required_apps_from_hooks(required_deps, local=True)
-			except IndexError:
+			except (IndexError, TypeError):
+				# hooks.py doesn't set required_apps
 				return []
-		try:
-			required_deps = get_required_deps(self.org, self.repo, self.tag or self.branch)
-			return required_apps_from_hooks(required_deps)
-		except Exception:
-			return []
+		return get_required_apps(self.org, self.repo, self.tag or self.branch)
 
 	def update_app_state(self):
 		from bench.bench import Bench
@@ -285,24 +321,109 @@ class App(AppMeta):
 		)
 
 
-def make_resolution_plan(app: App, bench: "Bench"):
+class ResolutionPlan(OrderedDict):
+	"""Apps to install, keyed by repo. Apps come before the apps they require,
+	so reversed, the plan is an order to install them in.
+
+	`levels` groups the repos so that each level only requires apps from the
+	levels before it, starting with the apps that require none.
+	"""
+
+	def __init__(self, *args, levels=None, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.levels = levels or []
+
+
+def make_resolution_plan(app: App, bench: "Bench") -> ResolutionPlan:
 	"""
 	decide what apps and versions to install and in what order
+
+	The dependency tree is walked a level at a time, resolving all apps of a
+	level concurrently, so a tree takes a round of network requests per level.
+	Raises CyclicDependencyError if apps require each other.
 	"""
-	resolution = OrderedDict()
-	resolution[app.repo] = app
+	from bench.exceptions import CyclicDependencyError
+	from bench.utils import run_parallel
 
-	for app_name in app._get_dependencies():
+	def resolve_app(app_name):
 		dep_app = App(app_name, bench=bench)
 		is_valid_frappe_branch(dep_app.url, dep_app.branch)
-		dep_app.required_by = app.name
-		if dep_app.repo in resolution:
-			click.secho(f"{dep_app.repo} is already resolved skipping", fg="yellow")
-			continue
-		resolution[dep_app.repo] = dep_app
-		resolution.update(make_resolution_plan(dep_app, bench))
-		app.local_resolution = [repo_name for repo_name, _ in reversed(resolution.items())]
-	return resolution
+		return dep_app
+
+	resolved = {app.repo: app}
+	requires = {}
+	level = [app]
+
+	while level:
+		dependencies, errors = run_parallel(
+			lambda repo: resolved[repo]._get_dependencies(), [a.repo for a in level]
+		)
+		for error in errors.values():
+			raise error
+
+		app_names = list(
+			OrderedDict.fromkeys(name for a in level for name in dependencies.get(a.repo, []))
+		)
+		dep_apps, errors = run_parallel(resolve_app, app_names)
+		for error in errors.values():
+			raise error
+
+		next_level = []
+		for parent in level:
+			requires[parent.repo] = []
+
+			for app_name in dependencies.get(parent.repo, []):
+				dep_app = dep_apps[app_name]
+				requires[parent.repo].append(dep_app.repo)
+
+				if dep_app.repo in resolved:
+					click.secho(f"{dep_app.repo} is already resolved skipping", fg="yellow")
+					continue
+
+				dep_app.required_by = parent.name
+				resolved[dep_app.repo] = dep_app
+				next_level.append(dep_app)
+
+		level = next_level
+
+	# group the apps into levels, each app after the apps it requires
+	levels, installed = [], set()
+	while len(installed) < len(resolved):
+		ready = [
+			repo
+			for repo in resolved
+			if repo not in installed and installed.issuperset(requires[repo])
+		]
+		if not ready:
+			cyclic = [repo for repo in resolved if repo not in installed]
+			raise CyclicDependencyError(f"Apps {', '.join(cyclic)} require each other")
+		levels.append(ready)
+		installed.update(ready)
+
+	install_order = [repo for level in levels for repo in level]
+	for repo, resolved_app in resolved.items():
+		if requires[repo]:
+			dependencies = get_all_requirements(repo, requires)
+			resolved_app.local_resolution = [
+				r for r in install_order if r in dependencies or r == repo
+			]
+
+	return ResolutionPlan(
+		((repo, resolved[repo]) for repo in reversed(install_order)), levels=levels
+	)
+
+
+def get_all_requirements(repo, requires):
+	"""Returns the apps repo requires, directly or through other apps"""
+	requirements, to_check = set(), list(requires[repo])
+
+	while to_check:
+		dependency = to_check.pop()
+		if dependency not in requirements:
+			requirements.add(dependency)
+			to_check.extend(requires[dependency])
+
+	return requirements
 
 
 def get_excluded_apps(bench_path="."):
@@ -451,12 +572,20 @@ def install_resolved_deps(
 	skip_assets=False,
 	verbose=False,
 ):
-	from bench.utils.app import check_existing_dir
+	"""Installs the apps of the resolution plan, a level of it at a time. Apps of
+	a level don't require each other, so they're cloned and installed concurrently,
+	upto `max_parallel_jobs` at once.
+	"""
+	from bench.utils import run_parallel
+	from bench.utils.app import check_existing_dir, get_app_name
 
 	if "frappe" in resolution:
 		# Terminal dependency
 		del resolution["frappe"]
 
+	to_install = []
+
+	# prompts are asked upfront, so the installs don't have to wait on them
 	for repo_name, app in reversed(resolution.items()):
 		existing_dir, path_to_app = check_existing_dir(bench_path, repo_name)
 		if existing_dir:
@@ -511,7 +640,36 @@ def install_resolved_deps(
 				shutil.rmtree(path_to_app)
 			else:
 				continue
-		app.install_resolved_apps(skip_assets=skip_assets, verbose=verbose)
+		to_install.append(repo_name)
+
+	levels = getattr(resolution, "levels", None) or [[repo] for repo in to_install]
+
+	def install_resolved_app(repo_name):
+		# assets are built once all apps are installed, as builds can't run concurrently
+		resolution[repo_name].install_resolved_apps(
+			skip_assets=True, verbose=verbose, restart_bench=False
+		)
+
+	for level in levels:
+		_, errors = run_parallel(
+			install_resolved_app,
+			[repo for repo in level if repo in to_install],
+			bench_path=bench_path,
+		)
+		for repo_name, error in errors.items():
+			# apps of the next levels require these, so they can't be installed
+			click.secho(f"Couldn't install {repo_name}: {error}", fg="red")
+			raise error
+
+	if not to_install:
+		return
+
+	if not skip_assets:
+		for repo_name in to_install:
+			app_name = get_app_name(bench_path, resolution[repo_name].app_name)
+			build_assets(bench_path=bench_path, app=app_name)
+
+	bench.reload(_raise=False)
 
 
 def new_app(app, no_git=None, bench_path="."):
@@ -550,9 +708,13 @@ def install_app(
 	restart_bench=True,
 	skip_assets=False,
 	resolution=UNSET_ARG,
+	skip_python=False,
+	skip_node=False,
 ):
 	import bench.cli as bench_cli
 	from bench.bench import Bench
+	from bench.utils.app import get_dependency_fingerprints
+	from bench.utils.wheelhouse import pip_install
 
 	install_text = f"Installing {app}"
 	click.secho(install_text, fg="yellow")
@@ -569,18 +731,30 @@ def install_app(
 	cache_flag = "--no-cache-dir" if no_cache else ""
 
 	app_path = os.path.realpath(os.path.join(bench_path, "apps", app))
+	fingerprints = get_dependency_fingerprints(app, bench_path)
+
+	# skipped when the python dependencies of all apps are installed together
+	if not skip_python:
+		with env_lock:
+			pip_install(
+				f"{quiet_flag} --upgrade -e {app_path} {cache_flag}",
+				bench_path=bench_path,
+				python=bench.python,
+			)
 
-	bench.run(
-		f"{bench.python} -m pip install {quiet_flag} --upgrade -e {app_path} {cache_flag}"
-	)
-
-	if conf.get("developer_mode"):
-		install_python_dev_dependencies(apps=app, bench_path=bench_path, verbose=verbose)
+			if conf.get("developer_mode"):
+				install_python_dev_dependencies(apps=app, bench_path=bench_path, verbose=verbose)
 
-	if os.path.exists(os.path.join(app_path, "package.json")):
-		bench.run("yarn install", cwd=app_path)
+	if not skip_node and os.path.exists(os.path.join(app_path, "package.json")):
+		yarn_install(app_path, bench_path=bench_path)
 
-	bench.apps.sync(app_name=app, required=resolution, branch=tag, app_dir=app_path)
+	with env_lock:
+		bench.apps.sync(app_name=app, required=resolution, branch=tag, app_dir=app_path)
+		# so later updates can skip installing the dependencies, unless they change
+		installed = {"python": not skip_python, "node": not skip_node}
+		bench.apps.update_fingerprints(
+			app, **{kind: value for kind, value in fingerprints.items() if installed[kind]}
+		)
 
 	if not skip_assets:
 		build_assets(bench_path=bench_path, app=app)
@@ -591,29 +765,127 @@ def install_app(
 		bench.reload(_raise=False)
 
 
-def pull_apps(apps=None, bench_path=".", reset=False):
-	"""Check all apps if there no local changes, pull"""
+def get_update_plan(apps=None, bench_path=".", reset=False):
+	"""Fetches the upstream branch of every app once, concurrently, and works out
+	what pulling it would bring in from the fetched commits. The plan is passed
+	to the later steps of `bench update`, so none of them has to fetch again.
+
+	Returns, for every app that's a git repo:
+	{app: {"remote", "branch", "head", "upstream_head", "current_version",
+	"upstream_version", "commits"}}
+
+	`remote` is False for apps without a remote, which aren't fetched, and apps
+	that couldn't be fetched have the exception raised under `error`. Shallow apps
+	are fetched as they are, they're unshallowed by pull_apps, once the update is
+	confirmed.
+	"""
 	from bench.bench import Bench
-	from bench.utils.app import get_current_branch, get_remote
+	from bench.utils import get_cmd_output, run_parallel
+	from bench.utils.app import (
+		get_current_branch,
+		get_current_version,
+		get_remote,
+		get_upstream_version,
+	)
 
 	bench = Bench(bench_path)
-	rebase = "--rebase" if bench.conf.get("rebase_on_pull") else ""
+	apps = apps or bench.apps
+	repos = [
+		app
+		for app in apps
+		if os.path.exists(os.path.join(get_repo_dir(app, bench_path=bench_path), ".git"))
+	]
+
+	def plan(app):
+		app_dir = get_repo_dir(app, bench_path=bench_path)
+		remote = get_remote(app, bench_path=bench_path)
+		branch = get_current_branch(app, bench_path=bench_path)
+		head = get_cmd_output("git rev-parse HEAD", cwd=app_dir)
+		app_plan = {"remote": remote, "branch": branch, "head": head}
+
+		try:
+			app_plan["current_version"] = get_current_version(app, bench_path=bench_path)
+		except Exception:
+			app_plan["current_version"] = None
+
+		if not remote:
+			return app_plan
+
+		logger.log(f"fetching {app}")
+		if os.path.exists(os.path.join(app_dir, ".git", "shallow")):
+			bench.run(f"git fetch --depth=1 --no-tags {remote} {branch}", cwd=app_dir)
+		else:
+			bench.run(f"git fetch {remote} {branch}", cwd=app_dir)
+
+		upstream_head = get_cmd_output("git rev-parse FETCH_HEAD", cwd=app_dir)
+		commits = get_cmd_output(f"git log --format='%h %s' HEAD..{upstream_head}", cwd=app_dir)
+		app_plan.update({"upstream_head": upstream_head, "commits": commits.splitlines()})
+
+		try:
+			app_plan["upstream_version"] = get_upstream_version(
+				app, branch=upstream_head, bench_path=bench_path, fetch=False
+			)
+		except Exception:
+			app_plan["upstream_version"] = None
+
+		return app_plan
+
+	update_plan, errors = run_parallel(plan, repos, bench_path=bench_path)
+	for app, error in errors.items():
+		update_plan[app] = {"error": error}
+
+	return {app: update_plan[app] for app in repos}
+
+
+def pull_apps(apps=None, bench_path=".", reset=False, plan=None):
+	"""Check all apps if there no local changes, pull
+
+	Apps are fetched in parallel (unless an update plan from get_update_plan is
+	passed), and their new commits are only merged in (or reset to) once every
+	fetch succeeded. If updating any app fails, apps that were already updated
+	are reset to where they were.
+
+	Returns {app: (previous commit, new commit)} for the apps that were pulled.
+	"""
+	from bench.bench import Bench
+	from bench.exceptions import CommandFailedError
+	from bench.utils import get_cmd_output, run_parallel
+	from bench.utils.app import get_changed_python_files, remove_stale_bytecode
+
+	bench = Bench(bench_path)
+	rebase = bench.conf.get("rebase_on_pull")
+	shallow_clone = bench.clone_strategy == "shallow"
 	apps = apps or bench.apps
 	excluded_apps = bench.excluded_apps
 
+	for app in apps:
+		if app in excluded_apps:
+			print(f"Skipping pull for app {app}")
+
+	repos = [
+		app
+		for app in apps
+		if app not in excluded_apps
+		and os.path.exists(os.path.join(get_repo_dir(app, bench_path=bench_path), ".git"))
+	]
+
 	# check for local changes
 	if not reset:
-		for app in apps:
-			if app in excluded_apps:
-				print(f"Skipping reset for app {app}")
-				continue
-			app_dir = get_repo_dir(app, bench_path=bench_path)
-			if os.path.exists(os.path.join(app_dir, ".git")):
-				out = subprocess.check_output("git status", shell=True, cwd=app_dir)
-				out = out.decode("utf-8")
-				if not re.search(r"nothing to commit, working (directory|tree) clean", out):
-					print(
-						f"""
+		statuses, errors = run_parallel(
+			lambda app: subprocess.check_output(
+				"git status", shell=True, cwd=get_repo_dir(app, bench_path=bench_path)
+			).decode("utf-8"),
+			repos,
+			bench_path=bench_path,
+		)
+		for error in errors.values():
+			raise error
+
+		for app in repos:
+			out = statuses[app]
+			if not re.search(r"nothing to commit, working (directory|tree) clean", out):
+				print(
+					f"""
 
 Cannot proceed with update: You have local changes in app "{app}" that are not committed.
 
@@ -624,47 +896,120 @@ Here are your choices:
 	with "bench update --reset" or for individual repositries "git reset --hard"
 2. If your changes are helpful for others, send in a pull request via GitHub and
 	wait for them to be merged in the core."""
-					)
-					sys.exit(1)
+				)
+				sys.exit(1)
+
+	# nothing is changed in the apps' working trees until every fetch succeeds
+	plan = dict(plan or {})
+	missing = [app for app in repos if app not in plan]
+	if missing:
+		plan.update(get_update_plan(missing, bench_path=bench_path, reset=reset))
+
+	for app in [app for app in repos if plan[app].get("remote") is False]:
+		# remote is False, i.e. remote doesn't exist, add the app to excluded_apps.txt
+		add_to_excluded_apps_txt(app, bench_path=bench_path)
+		print(
+			f"Skipping pull for app {app}, since remote doesn't exist, and"
+			" adding it to excluded apps"
+		)
+		repos.remove(app)
+
+	errors = [app for app in repos if "error" in plan[app]]
+	if errors:
+		for app in errors:
+			log(f"Couldn't fetch updates for {app}: {plan[app]['error']}", level=2)
+		raise CommandFailedError(
+			f"Couldn't fetch updates for {', '.join(errors)}, no app was updated"
+		)
 
-	for app in apps:
-		if app in excluded_apps:
-			print(f"Skipping pull for app {app}")
-			continue
+	def apply(app):
 		app_dir = get_repo_dir(app, bench_path=bench_path)
-		if os.path.exists(os.path.join(app_dir, ".git")):
-			remote = get_remote(app)
-			if not remote:
-				# remote is False, i.e. remote doesn't exist, add the app to excluded_apps.txt
-				add_to_excluded_apps_txt(app, bench_path=bench_path)
-				print(
-					f"Skipping pull for app {app}, since remote doesn't exist, and"
-					" adding it to excluded apps"
-				)
-				continue
+		upstream_head = plan[app]["upstream_head"]
+
+		is_shallow = os.path.exists(os.path.join(app_dir, ".git", "shallow"))
+		if is_shallow and not (shallow_clone and reset):
+			s = " to safely pull remote changes." if not reset else ""
+			print(f"Unshallowing {app}{s}")
+			bench.run(
+				f"git fetch {plan[app]['remote']} {get_unshallow_flags(bench.clone_strategy)}",
+				cwd=app_dir,
+			)
 
-			if not bench.conf.get("shallow_clone") or not reset:
-				is_shallow = os.path.exists(os.path.join(app_dir, ".git", "shallow"))
-				if is_shallow:
-					s = " to safely pull remote changes." if not reset else ""
-					print(f"Unshallowing {app}{s}")
-					bench.run(f"git fetch {remote} --unshallow", cwd=app_dir)
-
-			branch = get_current_branch(app, bench_path=bench_path)
-			logger.log(f"pulling {app}")
-			if reset:
-				reset_cmd = f"git reset --hard {remote}/{branch}"
-				if bench.conf.get("shallow_clone"):
-					bench.run(f"git fetch --depth=1 --no-tags {remote} {branch}", cwd=app_dir)
-					bench.run(reset_cmd, cwd=app_dir)
-					bench.run("git reflog expire --all", cwd=app_dir)
-					bench.run("git gc --prune=all", cwd=app_dir)
-				else:
-					bench.run("git fetch --all", cwd=app_dir)
-					bench.run(reset_cmd, cwd=app_dir)
-			else:
-				bench.run(f"git pull {rebase} {remote} {branch}", cwd=app_dir)
-			bench.run('find . -name "*.pyc" -delete', cwd=app_dir)
+		if reset:
+			bench.run(f"git reset --hard {upstream_head}", cwd=app_dir)
+		elif rebase:
+			if bench.run(f"git rebase {upstream_head}", cwd=app_dir, _raise=False):
+				bench.run("git rebase --abort", cwd=app_dir, _raise=False)
+				raise CommandFailedError(f"Couldn't rebase {app} on its remote branch")
+		else:
+			bench.run(f"git merge --no-edit {upstream_head}", cwd=app_dir)
+
+		return get_cmd_output("git rev-parse HEAD", cwd=app_dir)
+
+	previous_commits = {
+		app: get_cmd_output("git rev-parse HEAD", cwd=get_repo_dir(app, bench_path=bench_path))
+		for app in repos
+	}
+	new_commits, errors = run_parallel(apply, repos, bench_path=bench_path)
+	if errors:
+		for app in new_commits.keys() | errors.keys():
+			# also clears any merge left in progress
+			bench.run(
+				f"git reset --hard {previous_commits[app]}",
+				cwd=get_repo_dir(app, bench_path=bench_path),
+				_raise=False,
+			)
+		raise CommandFailedError(
+			f"Couldn't update {', '.join(errors)}, all apps were reset to their previous commits"
+		)
+
+	def cleanup(app):
+		app_dir = get_repo_dir(app, bench_path=bench_path)
+
+		if previous_commits[app] != new_commits[app]:
+			_, removed = get_changed_python_files(
+				app, previous_commits[app], new_commits[app], bench_path=bench_path
+			)
+			remove_stale_bytecode(app, removed, bench_path=bench_path)
+
+		# pruning is left until every app is updated, it drops the commits rolled back to
+		if reset and shallow_clone:
+			bench.run("git reflog expire --all", cwd=app_dir)
+			bench.run("git gc --prune=all", cwd=app_dir)
+
+	run_parallel(cleanup, repos, bench_path=bench_path)
+
+	pulled = {app: (previous_commits[app], new_commits[app]) for app in repos}
+	print_pull_summary(pulled, plan)
+
+	return pulled
+
+
+def get_unshallow_flags(clone_strategy):
+	"""Apart from with the `full` strategy, history is fetched without file contents,
+	those are fetched as they're checked out"""
+	if clone_strategy == "full":
+		return "--unshallow"
+	return "--unshallow --filter=blob:none"
+
+
+def print_pull_summary(pulled, plan=None):
+	if not pulled:
+		return
+
+	plan = plan or {}
+	width = max(len(app) for app in pulled)
+	click.secho("\nPulled apps:", fg="green")
+
+	for app, (previous_commit, new_commit) in pulled.items():
+		if previous_commit == new_commit:
+			status = "already up to date"
+		else:
+			status = f"{previous_commit[:7]} → {new_commit[:7]}"
+			commits = plan.get(app, {}).get("commits")
+			if commits:
+				status += f" ({len(commits)} new commit{'s' if len(commits) > 1 else ''})"
+		click.echo(f"  {app.ljust(width)}  {status}")
 
 
 def use_rq(bench_path):
@@ -678,6 +1023,8 @@ def get_repo_dir(app, bench_path="."):
 
 
 def is_git_repo(app_path):
+	import git
+
 	try:
 		git.Repo(app_path, search_parent_directories=False)
 		return True
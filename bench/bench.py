@@ -6,6 +6,7 @@ import shutil
 import json
 import sys
 import logging
+import threading
 from typing import List, MutableSequence, TYPE_CHECKING, Union
 
 # imports - module imports
@@ -17,13 +18,13 @@ from bench.utils import (
 	paths_in_bench,
 	exec_cmd,
 	is_bench_directory,
-	is_frappe_app,
-	get_cmd_output,
+	get_frappe_apps,
 	get_git_version,
 	log,
-	run_frappe_cmd,
+	write_json,
 )
 from bench.utils.bench import (
+	build_assets,
 	validate_app_installed_on_sites,
 	restart_supervisor_processes,
 	restart_systemd_processes,
@@ -31,9 +32,13 @@ from bench.utils.bench import (
 	remove_backups_crontab,
 	get_venv_path,
 	get_env_cmd,
+	get_installed_distributions,
+	install_python_apps,
+	is_package_current,
+	normalize_package_name,
 )
 from bench.utils.render import job, step
-from bench.utils.app import get_current_version
+from bench.utils.app import get_current_version, get_dependency_fingerprints
 from bench.app import is_git_repo
 
 
@@ -42,6 +47,9 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(bench.PROJECT_NAME)
 
+# apps.json is updated by concurrent installs, each with its own copy of the states
+states_lock = threading.RLock()
+
 
 class Base:
 	def run(self, cmd, cwd=None, _raise=True):
@@ -83,6 +91,23 @@ class Bench(Base, Validator):
 
 		return get_git_version() > 1.9
 
+	@property
+	def clone_strategy(self) -> str:
+		"""How apps are cloned, set by `clone_strategy` in common_site_config.json:
+
+		- full: the entire history
+		- shallow: only the latest commit (--depth 1)
+		- blobless: the entire history, with file contents fetched on demand (--filter=blob:none)
+
+		Defaults to shallow or full, going by `shallow_clone`.
+		"""
+		strategy = self.conf.get("clone_strategy")
+
+		if strategy in ("full", "shallow", "blobless"):
+			return strategy
+
+		return "shallow" if self.shallow_clone else "full"
+
 	@property
 	def excluded_apps(self) -> List:
 		try:
@@ -93,11 +118,16 @@ class Bench(Base, Validator):
 
 	@property
 	def sites(self) -> List:
-		return [
-			path
-			for path in os.listdir(os.path.join(self.name, "sites"))
-			if os.path.exists(os.path.join("sites", path, "site_config.json"))
-		]
+		return self.site_registry.sites
+
+	@property
+	def site_registry(self):
+		from bench.config.site_config import SiteRegistry
+
+		if not hasattr(self, "_site_registry"):
+			self._site_registry = SiteRegistry(self.name)
+
+		return self._site_registry
 
 	@property
 	def conf(self):
@@ -136,9 +166,9 @@ class Bench(Base, Validator):
 		self.reload(_raise=False)
 
 	@step(title="Building Bench Assets", success="Bench Assets Built")
-	def build(self):
-		# build assets & stuff
-		run_frappe_cmd("build", bench_path=self.name)
+	def build(self, force=False):
+		# build assets & stuff, of the apps whose sources changed
+		build_assets(bench_path=self.name, force=force)
 
 	@step(title="Reloading Bench Processes", success="Bench Processes Reloaded")
 	def reload(self, web=False, supervisor=True, systemd=True, _raise=True):
@@ -154,15 +184,13 @@ class Bench(Base, Validator):
 
 	def get_installed_apps(self) -> List:
 		"""Returns list of installed apps on bench, not in excluded_apps.txt"""
-		try:
-			installed_packages = get_cmd_output(f"{self.python} -m pip freeze", cwd=self.name)
-		except Exception:
-			installed_packages = []
+		installed_packages = get_installed_distributions(self.name)
 
 		return [
 			app
 			for app in self.apps
-			if app not in self.excluded_apps and app in installed_packages
+			if app not in self.excluded_apps
+			and normalize_package_name(app) in installed_packages
 		]
 
 
@@ -190,6 +218,13 @@ class BenchApps(MutableSequence):
 	):
 		if required == UNSET_ARG:
 			required = []
+
+		with states_lock:
+			# others may have updated apps.json since it was read
+			self.set_states()
+			self._update_apps_states(app_dir, app_name, branch, required)
+
+	def _update_apps_states(self, app_dir, app_name, branch, required):
 		if self.apps and not os.path.exists(self.states_path):
 			# idx according to apps listed in apps.txt (backwards compatibility)
 			# Keeping frappe as the first app.
@@ -250,8 +285,37 @@ class BenchApps(MutableSequence):
 				"version": version,
 			}
 
-		with open(self.states_path, "w") as f:
-			f.write(json.dumps(self.states, indent=4))
+		self.save_states()
+
+	def save_states(self):
+		# written aside & renamed in place, so apps.json is never read half written
+		write_json(self.states_path, self.states, indent=4)
+
+	def get_changed_dependencies(self, app: str, kind: str, fingerprints=None) -> bool:
+		"""Checks if the app's dependencies of kind, "python" or "node", changed since
+		they were last installed, going by the fingerprints recorded in apps.json. Node
+		dependencies are reinstalled if the app's node_modules is gone too."""
+		fingerprints = fingerprints or get_dependency_fingerprints(app, self.bench.name)
+		recorded = self.states.get(app, {}).get("fingerprints", {})
+
+		if kind == "node":
+			app_path = os.path.join(self.bench.name, "apps", app)
+			if os.path.exists(os.path.join(app_path, "package.json")) and not os.path.isdir(
+				os.path.join(app_path, "node_modules")
+			):
+				return True
+
+		return recorded.get(kind) != fingerprints[kind]
+
+	def update_fingerprints(self, app: str, **fingerprints):
+		"""Records the fingerprints of the app's dependencies once they're installed"""
+		with states_lock:
+			self.set_states()
+			if app not in self.states:
+				return
+
+			self.states[app].setdefault("fingerprints", {}).update(fingerprints)
+			self.save_states()
 
 	def sync(
 		self,
@@ -273,11 +337,7 @@ class BenchApps(MutableSequence):
 
 	def initialize_apps(self):
 		try:
-			self.apps = [
-				x
-				for x in os.listdir(os.path.join(self.bench.name, "apps"))
-				if is_frappe_app(os.path.join(self.bench.name, "apps", x))
-			]
+			self.apps = get_frappe_apps(self.bench.name)
 			self.apps.remove("frappe")
 			self.apps.insert(0, "frappe")
 		except FileNotFoundError:
@@ -349,6 +409,8 @@ class BenchSetup(Base):
 		import bench.cli
 		import click
 
+		from bench.utils.wheelhouse import pip_install
+
 		verbose = bench.cli.verbose
 
 		click.secho("Setting Up Environment", fg="yellow")
@@ -364,9 +426,10 @@ class BenchSetup(Base):
 		self.wheel()
 
 		if os.path.exists(frappe):
-			self.run(
-				f"{self.bench.python} -m pip install {quiet_flag} --upgrade -e {frappe}",
-				cwd=self.bench.name,
+			pip_install(
+				f"{quiet_flag} --upgrade -e {frappe}",
+				bench_path=self.bench.name,
+				python=self.bench.python,
 			)
 
 	@step(title="Setting Up Bench Config", success="Bench Config Set Up")
@@ -395,6 +458,9 @@ class BenchSetup(Base):
 		verbose = bench.cli.verbose or verbose
 		quiet_flag = "" if verbose else "--quiet"
 
+		if is_package_current("pip", bench_path=self.bench.name):
+			return
+
 		return self.run(
 			f"{self.bench.python} -m pip install {quiet_flag} --upgrade pip", cwd=self.bench.name
 		)
@@ -408,6 +474,9 @@ class BenchSetup(Base):
 		verbose = bench.cli.verbose or verbose
 		quiet_flag = "" if verbose else "--quiet"
 
+		if "wheel" in get_installed_distributions(self.bench.name):
+			return
+
 		return self.run(
 			f"{self.bench.python} -m pip install {quiet_flag} wheel", cwd=self.bench.name
 		)
@@ -447,43 +516,106 @@ class BenchSetup(Base):
 
 		logger.log("backups were set up")
 
+	def get_changed_apps(self, apps, kind, force=False):
+		"""Returns the apps whose dependencies of kind changed since they were last
+		installed, or all apps if forced"""
+		if force:
+			return list(apps)
+
+		changed = [app for app in apps if self.bench.apps.get_changed_dependencies(app, kind)]
+
+		for app in apps:
+			if app not in changed:
+				log(f"{kind.title()} dependencies of {app} are unchanged, skipping", no_log=True)
+
+		return changed
+
 	@job(title="Setting Up Bench Dependencies", success="Bench Dependencies Set Up")
-	def requirements(self, apps=None):
-		"""Install and upgrade specified / all installed apps on given Bench"""
+	def requirements(self, apps=None, force=False, node=True, batch=None):
+		"""Install and upgrade specified / all installed apps on given Bench. Only
+		dependencies that changed since they were last installed are, unless forced.
+		Node dependencies are left out if node is False.
+
+		With batch, or `pip_batch_install` set in common_site_config.json, the apps'
+		python dependencies are installed with a single pip resolution."""
 		from bench.app import App
 
 		apps = apps or self.bench.apps
+		batch_install = self.bench.conf.get("pip_batch_install") if batch is None else batch
+		python_apps = self.get_changed_apps(apps, "python", force=force)
+		node_apps = self.get_changed_apps(apps, "node", force=force) if node else []
 
 		self.pip()
 
+		if batch_install and python_apps:
+			install_python_apps(python_apps, bench_path=self.bench.name)
+			self.update_fingerprints(python_apps, "python")
+
+		apps = [app for app in apps if app in python_apps or app in node_apps]
 		print(f"Installing {len(apps)} applications...")
 
-		for app in apps:
+		for app in python_apps:
 			path_to_app = os.path.join(self.bench.name, "apps", app)
-			app = App(path_to_app, bench=self.bench, to_clone=False).install(
-				skip_assets=True, restart_bench=False, ignore_resolution=True
+			App(path_to_app, bench=self.bench, to_clone=False).install(
+				skip_assets=True,
+				restart_bench=False,
+				ignore_resolution=True,
+				skip_python=batch_install,
+				skip_node=True,
 			)
 
-	def python(self, apps=None):
-		"""Install and upgrade Python dependencies for specified / all installed apps on given Bench"""
+		# the apps' node_modules are separate, so they're installed concurrently
+		if node_apps:
+			self.node(apps=node_apps, force=True)
+
+	def python(self, apps=None, force=False, batch=None):
+		"""Install and upgrade Python dependencies for specified / all installed apps on given Bench.
+		They're installed with a single pip resolution with batch, which defaults to
+		`pip_batch_install` in common_site_config.json."""
 		import bench.cli
 
-		apps = apps or self.bench.apps
+		from bench.utils.wheelhouse import pip_install
+
+		apps = self.get_changed_apps(apps or self.bench.apps, "python", force=force)
 
 		quiet_flag = "" if bench.cli.verbose else "--quiet"
 
+		if batch is None:
+			batch = self.bench.conf.get("pip_batch_install")
+
 		self.pip()
 
-		for app in apps:
-			app_path = os.path.join(self.bench.name, "apps", app)
-			log(f"\nInstalling python dependencies for {app}", level=3, no_log=True)
-			self.run(f"{self.bench.python} -m pip install {quiet_flag} --upgrade -e {app_path}")
+		if batch:
+			if apps:
+				install_python_apps(apps, bench_path=self.bench.name)
+		else:
+			for app in apps:
+				app_path = os.path.join(self.bench.name, "apps", app)
+				log(f"\nInstalling python dependencies for {app}", level=3, no_log=True)
+				pip_install(
+					f"{quiet_flag} --upgrade -e {app_path}",
+					bench_path=self.bench.name,
+					python=self.bench.python,
+				)
+
+		self.update_fingerprints(apps, "python")
 
-	def node(self, apps=None):
+	def node(self, apps=None, force=False):
 		"""Install and upgrade Node dependencies for specified / all apps on given Bench"""
 		from bench.utils.bench import update_node_packages
 
-		return update_node_packages(bench_path=self.bench.name, apps=apps)
+		apps = self.get_changed_apps(apps or self.bench.apps, "node", force=force)
+
+		if not apps:
+			return
+
+		update_node_packages(bench_path=self.bench.name, apps=apps)
+		self.update_fingerprints(apps, "node")
+
+	def update_fingerprints(self, apps, kind):
+		for app in apps:
+			fingerprints = get_dependency_fingerprints(app, self.bench.name)
+			self.bench.apps.update_fingerprints(app, **{kind: fingerprints[kind]})
 
 
 class BenchTearDown:
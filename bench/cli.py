@@ -11,7 +11,6 @@ import click
 
 # imports - module imports
 import bench
-from bench.bench import Bench
 from bench.commands import bench_command
 from bench.config.common_site_config import get_config
 from bench.utils import (
@@ -20,12 +19,14 @@ from bench.utils import (
 	find_parent_bench,
 	get_env_frappe_commands,
 	get_cmd_output,
+	get_frappe_cmd_cache,
 	is_bench_directory,
 	is_dist_editable,
 	is_root,
 	log,
 	setup_logging,
 	get_cmd_from_sysargv,
+	update_frappe_cmd_cache,
 )
 from bench.utils.bench import get_env_cmd
 
@@ -122,7 +123,7 @@ def cli():
 	if cmd_from_sys and cmd_from_sys.split("=", 1)[0].strip() in opts:
 		bench_command()
 
-	if cmd_from_sys in bench_command.commands:
+	if bench_command.has_command(cmd_from_sys):
 		with execute_cmd(check_for_update=is_cli_command, command=command, logger=logger):
 			bench_command()
 
@@ -188,17 +189,32 @@ def change_uid():
 
 
 def app_cmd(bench_path="."):
+	run_in_helper(sys.argv[1:], bench_path=bench_path)
+
 	f = get_env_cmd("python", bench_path=bench_path)
 	os.chdir(os.path.join(bench_path, "sites"))
 	os.execv(f, [f] + ["-m", "frappe.utils.bench_helper"] + sys.argv[1:])
 
 
 def frappe_cmd(bench_path="."):
+	run_in_helper(["frappe"] + sys.argv[1:], bench_path=bench_path)
+
 	f = get_env_cmd("python", bench_path=bench_path)
 	os.chdir(os.path.join(bench_path, "sites"))
 	os.execv(f, [f] + ["-m", "frappe.utils.bench_helper", "frappe"] + sys.argv[1:])
 
 
+def run_in_helper(argv, bench_path="."):
+	"""Runs the command in the bench's resident helper and exits with its exit code,
+	if the helper is running. Otherwise returns so the command can be exec'd."""
+	from bench.utils.daemon import forward_to_helper
+
+	exit_code = forward_to_helper(argv, bench_path=bench_path)
+
+	if exit_code is not None:
+		sys.exit(exit_code)
+
+
 def get_frappe_commands():
 	if not is_bench_directory():
 		return set()
@@ -207,16 +223,23 @@ def get_frappe_commands():
 
 
 def get_frappe_help(bench_path="."):
+	cache = get_frappe_cmd_cache(bench_path=bench_path)
+	if "help" in cache:
+		return cache["help"]
+
 	python = get_env_cmd("python", bench_path=bench_path)
 	sites_path = os.path.join(bench_path, "sites")
 	try:
 		out = get_cmd_output(
 			f"{python} -m frappe.utils.bench_helper get-frappe-help", cwd=sites_path
 		)
-		return "\n\nFramework commands:\n" + out.split("Commands:")[1]
+		cache["help"] = "\n\nFramework commands:\n" + out.split("Commands:")[1]
 	except Exception:
 		return ""
 
+	update_frappe_cmd_cache(cache, bench_path=bench_path)
+	return cache["help"]
+
 
 def change_working_directory():
 	"""Allows bench commands to be run from anywhere inside a bench directory"""
@@ -235,7 +258,9 @@ def setup_clear_cache():
 	f = copy(os.chdir)
 
 	def _chdir(*args, **kwargs):
-		Bench.cache_clear()
+		# bench.bench is imported lazily, only clear its cache if it's been used
+		if "bench.bench" in sys.modules:
+			sys.modules["bench.bench"].Bench.cache_clear()
 		get_env_cmd.cache_clear()
 		return f(*args, **kwargs)
 
@@ -37,93 +37,78 @@ def bench_command(bench_path="."):
 	bench.set_frappe_version(bench_path=bench_path)
 
 
-from bench.commands.make import (
-	drop,
-	exclude_app_for_update,
-	get_app,
-	include_app_for_update,
-	init,
-	new_app,
-	pip,
-	remove_app,
+# commands are registered by name and the module defining a command is imported
+# only when that command is run. This keeps `bench --version` and commands
+# forwarded to frappe from importing the dependencies of every bench command.
+bench_command.add_lazy_command("bench.commands.make:init", "init")
+bench_command.add_lazy_command("bench.commands.make:drop", "drop")
+bench_command.add_lazy_command("bench.commands.make:get_app", ["get", "get-app"])
+bench_command.add_lazy_command("bench.commands.make:new_app", "new-app")
+bench_command.add_lazy_command(
+	"bench.commands.make:remove_app", ["remove", "rm", "remove-app"]
 )
+bench_command.add_lazy_command("bench.commands.make:exclude_app_for_update", "exclude-app")
+bench_command.add_lazy_command("bench.commands.make:include_app_for_update", "include-app")
+bench_command.add_lazy_command("bench.commands.make:pip", "pip")
 
-bench_command.add_command(init)
-bench_command.add_command(drop)
-bench_command.add_command(get_app)
-bench_command.add_command(new_app)
-bench_command.add_command(remove_app)
-bench_command.add_command(exclude_app_for_update)
-bench_command.add_command(include_app_for_update)
-bench_command.add_command(pip)
-
-
-from bench.commands.update import (
-	retry_upgrade,
-	switch_to_branch,
-	switch_to_develop,
-	update,
+
+bench_command.add_lazy_command("bench.commands.update:update", "update")
+bench_command.add_lazy_command("bench.commands.update:retry_upgrade", "retry-upgrade")
+bench_command.add_lazy_command("bench.commands.update:switch_to_branch", "switch-to-branch")
+bench_command.add_lazy_command(
+	"bench.commands.update:switch_to_develop", "switch-to-develop"
 )
 
-bench_command.add_command(update)
-bench_command.add_command(retry_upgrade)
-bench_command.add_command(switch_to_branch)
-bench_command.add_command(switch_to_develop)
-
-
-from bench.commands.utils import (
-	backup_all_sites,
-	bench_src,
-	disable_production,
-	download_translations,
-	find_benches,
-	migrate_env,
-	renew_lets_encrypt,
-	restart,
-	set_mariadb_host,
-	set_nginx_port,
-	set_redis_cache_host,
-	set_redis_queue_host,
-	set_redis_socketio_host,
-	set_ssl_certificate,
-	set_ssl_certificate_key,
-	set_url_root,
-	start,
+
+bench_command.add_lazy_command("bench.commands.utils:start", "start")
+bench_command.add_lazy_command("bench.commands.utils:restart", "restart")
+bench_command.add_lazy_command("bench.commands.utils:set_nginx_port", "set-nginx-port")
+bench_command.add_lazy_command(
+	"bench.commands.utils:set_ssl_certificate", "set-ssl-certificate"
+)
+bench_command.add_lazy_command("bench.commands.utils:set_ssl_certificate_key", "set-ssl-key")
+bench_command.add_lazy_command("bench.commands.utils:set_url_root", "set-url-root")
+bench_command.add_lazy_command("bench.commands.utils:set_mariadb_host", "set-mariadb-host")
+bench_command.add_lazy_command(
+	"bench.commands.utils:set_redis_cache_host", "set-redis-cache-host"
+)
+bench_command.add_lazy_command(
+	"bench.commands.utils:set_redis_queue_host", "set-redis-queue-host"
+)
+bench_command.add_lazy_command(
+	"bench.commands.utils:set_redis_socketio_host", "set-redis-socketio-host"
 )
+bench_command.add_lazy_command(
+	"bench.commands.utils:download_translations", "download-translations"
+)
+bench_command.add_lazy_command("bench.commands.utils:backup_all_sites", "backup-all-sites")
+bench_command.add_lazy_command(
+	"bench.commands.utils:renew_lets_encrypt", "renew-lets-encrypt"
+)
+bench_command.add_lazy_command(
+	"bench.commands.utils:disable_production", "disable-production"
+)
+bench_command.add_lazy_command("bench.commands.utils:bench_src", "src")
+bench_command.add_lazy_command("bench.commands.utils:find_benches", "find")
+bench_command.add_lazy_command("bench.commands.utils:migrate_env", "migrate-env")
+
+
+bench_command.add_lazy_command("bench.commands.setup:setup", "setup")
 
-bench_command.add_command(start)
-bench_command.add_command(restart)
-bench_command.add_command(set_nginx_port)
-bench_command.add_command(set_ssl_certificate)
-bench_command.add_command(set_ssl_certificate_key)
-bench_command.add_command(set_url_root)
-bench_command.add_command(set_mariadb_host)
-bench_command.add_command(set_redis_cache_host)
-bench_command.add_command(set_redis_queue_host)
-bench_command.add_command(set_redis_socketio_host)
-bench_command.add_command(download_translations)
-bench_command.add_command(backup_all_sites)
-bench_command.add_command(renew_lets_encrypt)
-bench_command.add_command(disable_production)
-bench_command.add_command(bench_src)
-bench_command.add_command(find_benches)
-bench_command.add_command(migrate_env)
 
-from bench.commands.setup import setup
+bench_command.add_lazy_command("bench.commands.config:config", "config")
 
-bench_command.add_command(setup)
 
+bench_command.add_lazy_command("bench.commands.git:remote_set_url", "remote-set-url")
+bench_command.add_lazy_command("bench.commands.git:remote_reset_url", "remote-reset-url")
+bench_command.add_lazy_command("bench.commands.git:remote_urls", "remote-urls")
 
-from bench.commands.config import config
 
-bench_command.add_command(config)
+bench_command.add_lazy_command("bench.commands.install:install", "install")
 
-from bench.commands.git import remote_reset_url, remote_set_url, remote_urls
 
-bench_command.add_command(remote_set_url)
-bench_command.add_command(remote_reset_url)
-bench_command.add_command(remote_urls)
+bench_command.add_lazy_command("bench.commands.helper:helper", "helper")
 
-from bench.commands.install import install
 
-bench_command.add_command(install)
+bench_command.add_lazy_command("bench.commands.cache:cache", "cache")
+bench_command.add_lazy_command("bench.commands.template:template", "template")
@@ -0,0 +1,88 @@
+# imports - third party imports
+import click
+
+
+@click.group(help="Manage the caches shared by the benches on this host")
+def cache():
+	pass
+
+
+@click.command("prune-wheels", help="Remove old versions of wheels from the wheelhouse")
+@click.option(
+	"--keep",
+	default=1,
+	type=int,
+	help="Number of versions of each package to keep, for each interpreter & platform",
+)
+def prune_wheels(keep):
+	from bench.utils import log
+	from bench.utils.wheelhouse import get_wheelhouse_dir, prune_wheelhouse
+
+	wheelhouse = get_wheelhouse_dir(bench_path=".")
+
+	if not wheelhouse:
+		log("The wheelhouse isn't enabled. Set `wheelhouse` in common_site_config.json")
+		return
+
+	removed = prune_wheelhouse(wheelhouse, keep=keep)
+	log(f"Removed {len(removed)} wheels from {wheelhouse}", level=1)
+
+
+@click.command("assets", help="Show the size and hit rate of the cache of built assets")
+@click.option("--evict", is_flag=True, help="Evict old entries, going by the configured limits")
+@click.option("--clear", is_flag=True, help="Remove all cached builds")
+def asset_cache(evict=False, clear=False):
+	import shutil
+
+	from bench.utils import log
+	from bench.utils.asset_cache import evict_assets, get_asset_cache_dir, get_entries, get_stats
+
+	cache_dir = get_asset_cache_dir(bench_path=".")
+
+	if not cache_dir:
+		log("The asset cache isn't enabled. Set `asset_cache` in common_site_config.json")
+		return
+
+	if clear:
+		for entry in get_entries(bench_path="."):
+			shutil.rmtree(entry["path"], ignore_errors=True)
+		log("Cleared the asset cache", level=1)
+	elif evict:
+		log(f"Evicted {len(evict_assets(bench_path='.'))} builds from the asset cache", level=1)
+
+	entries = get_entries(bench_path=".")
+	stats = get_stats(bench_path=".")
+	lookups = stats["hits"] + stats["misses"]
+	hit_rate = f"{stats['hits'] / lookups:.0%}" if lookups else "-"
+
+	print(f"Asset cache: {cache_dir}")
+	print(f"Builds: {len(entries)}, {sum(e['size'] for e in entries) / 1024 / 1024:.1f} MB")
+	print(f"Hits: {stats['hits']}, misses: {stats['misses']}, hit rate: {hit_rate}")
+	print(f"Evictions: {stats['evictions']}")
+
+
+@click.command("node-modules", help="Show the size of the node_modules store, and the space it saves")
+@click.option("--prune", is_flag=True, help="Remove files no app's node_modules links to anymore")
+def node_modules_store(prune=False):
+	from bench.utils import log
+	from bench.utils.node_store import get_node_store_dir, get_store_stats, prune_node_store
+
+	store = get_node_store_dir(bench_path=".")
+
+	if not store:
+		log("The node_modules store isn't enabled. Set `node_modules_store` in common_site_config.json")
+		return
+
+	if prune:
+		log(f"Removed {len(prune_node_store(store))} unused files from the node_modules store", level=1)
+
+	stats = get_store_stats(store)
+
+	print(f"node_modules store: {store}")
+	print(f"Files: {stats['files']}, {stats['size'] / 1024 / 1024:.1f} MB, {stats['unused']} unused")
+	print(f"Links: {stats['links']}, saving {stats['saved'] / 1024 / 1024:.1f} MB")
+
+
+cache.add_command(prune_wheels)
+cache.add_command(asset_cache)
+cache.add_command(node_modules_store)
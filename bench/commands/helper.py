@@ -0,0 +1,52 @@
+# imports - third party imports
+import click
+
+
+@click.group(
+	help="Manage the bench helper: a resident process that keeps frappe imported to run"
+	" forwarded commands like `bench --site x migrate` without paying its startup cost"
+)
+def helper():
+	pass
+
+
+@click.command("start", help="Start the bench helper, restarting it if already running")
+def start_helper():
+	from bench.utils import log
+	from bench.utils.daemon import start_helper
+
+	pid = start_helper(bench_path=".")
+	log(f"Bench helper started with pid {pid}", level=1)
+
+
+@click.command("stop", help="Stop the bench helper")
+def stop_helper():
+	from bench.utils import log
+	from bench.utils.daemon import stop_helper
+
+	if stop_helper(bench_path="."):
+		log("Bench helper stopped", level=1)
+	else:
+		log("Bench helper isn't running")
+
+
+@click.command("status", help="Show whether the bench helper is running and up to date")
+def helper_status():
+	from bench.utils.daemon import get_helper_pid, is_helper_current
+
+	pid = get_helper_pid(bench_path=".")
+
+	if not pid:
+		print("Bench helper isn't running")
+	elif not is_helper_current(bench_path="."):
+		print(
+			f"Bench helper is running with pid {pid}, but the env or apps have changed"
+			" since. Commands will bypass it until it's restarted with `bench helper start`"
+		)
+	else:
+		print(f"Bench helper is running with pid {pid}")
+
+
+helper.add_command(start_helper)
+helper.add_command(stop_helper)
+helper.add_command(helper_status)
@@ -25,6 +25,11 @@ import click
 @click.option(
 	"--clone-without-update", is_flag=True, help="copy repos from path without update"
 )
+@click.option(
+	"--clone-env",
+	is_flag=True,
+	help="copy the python env too, with --clone-from, instead of installing a new one",
+)
 @click.option("--no-procfile", is_flag=True, help="Do not create a Procfile")
 @click.option(
 	"--no-backups",
@@ -38,6 +43,16 @@ import click
 )
 @click.option("--skip-assets", is_flag=True, default=False, help="Do not build assets")
 @click.option("--install-app", help="Install particular app after initialization")
+@click.option(
+	"--git-mirror",
+	default=None,
+	help="Clone apps through bare mirrors kept in this directory, which can be shared by benches",
+)
+@click.option(
+	"--template",
+	default=None,
+	help="Copy apps, env & assets from a template made with `bench template create`",
+)
 @click.option("--verbose", is_flag=True, help="Verbose output during install")
 def init(
 	path,
@@ -54,6 +69,9 @@ def init(
 	skip_assets=False,
 	python="python3",
 	install_app=None,
+	git_mirror=None,
+	clone_env=False,
+	template=None,
 ):
 	import os
 
@@ -79,6 +97,9 @@ def init(
 			skip_assets=skip_assets,
 			python=python,
 			verbose=verbose,
+			git_mirror=git_mirror,
+			clone_env=clone_env,
+			template=template,
 		)
 		log(f"Bench {path} initialized", level=1)
 	except SystemExit:
@@ -213,8 +213,21 @@ def setup_socketio():
 	default=False,
 	is_flag=True,
 )
+@click.option(
+	"--force",
+	help="Install dependencies of all apps, even those that didn't change since they were last installed",
+	default=False,
+	is_flag=True,
+)
+@click.option(
+	"--batch/--no-batch",
+	help="Install the apps' python dependencies with a single pip resolution, instead of one per app. Defaults to `pip_batch_install` in common_site_config.json",
+	default=None,
+)
 @click.argument("apps", nargs=-1)
-def setup_requirements(node=False, python=False, dev=False, apps=None):
+def setup_requirements(
+	node=False, python=False, dev=False, force=False, batch=None, apps=None
+):
 	"""
 	Setup Python and Node dependencies.
 
@@ -225,13 +238,13 @@ def setup_requirements(node=False, python=False, dev=False, apps=None):
 	bench = Bench(".")
 
 	if not (node or python or dev):
-		bench.setup.requirements(apps=apps)
+		bench.setup.requirements(apps=apps, force=force, batch=batch)
 
 	elif not node and not dev:
-		bench.setup.python(apps=apps)
+		bench.setup.python(apps=apps, force=force, batch=batch)
 
 	elif not python and not dev:
-		bench.setup.node(apps=apps)
+		bench.setup.node(apps=apps, force=force)
 
 	else:
 		from bench.utils.bench import install_python_dev_dependencies
@@ -0,0 +1,58 @@
+# imports - standard imports
+import os
+
+# imports - third party imports
+import click
+
+
+@click.group(
+	help="Manage bench templates: initialized benches that `bench init --template` copies"
+	" instead of setting up a new bench from scratch"
+)
+def template():
+	pass
+
+
+@click.command(
+	"create",
+	help="Record the apps, env, node_modules & assets of the current bench as a template",
+)
+@click.option(
+	"--name", default=None, help="Name of the template, defaults to <frappe-branch>-py<version>"
+)
+def create_template(name=None):
+	from bench.utils import log
+	from bench.utils.template import create_template
+
+	template = create_template(bench_path=".", name=name)
+	log(f"Template created at {template['path']}", level=1)
+
+
+@click.command("use", help="Initialize a new bench at path from the template")
+@click.argument("name")
+@click.argument("path")
+@click.pass_context
+def use_template(ctx, name, path):
+	from bench.commands.make import init
+
+	ctx.invoke(init, path=path, template=name)
+
+
+@click.command("list", help="List the templates on this host")
+def list_templates():
+	from datetime import datetime
+
+	from bench.utils.template import get_templates
+
+	for template in get_templates():
+		created_at = datetime.fromtimestamp(template["created_at"]).strftime("%Y-%m-%d %H:%M")
+		print(
+			f"{os.path.basename(template['path'])}\tfrappe {template['frappe_branch']},"
+			f" python {template['python_version']}, created {created_at}"
+			f" from {template['source']}"
+		)
+
+
+template.add_command(create_template)
+template.add_command(use_template)
+template.add_command(list_templates)
@@ -1,10 +1,6 @@
 # imports - third party imports
 import click
 
-# imports - module imports
-from bench.app import pull_apps
-from bench.utils.bench import post_upgrade, patch_sites, build_assets
-
 
 @click.command(
 	"update",
@@ -35,12 +31,21 @@ from bench.utils.bench import post_upgrade, patch_sites, build_assets
 	is_flag=True,
 	help="If set, Python bytecode won't be compiled before restarting the processes",
 )
-@click.option("--force", is_flag=True, help="Forces major version upgrades")
+@click.option(
+	"--force",
+	is_flag=True,
+	help="Forces major version upgrades, and installs requirements of all apps even if their dependencies didn't change",
+)
 @click.option(
 	"--reset",
 	is_flag=True,
 	help="Hard resets git branch's to their new states overriding any changes and overriding rebase on pull",
 )
+@click.option(
+	"--dry-run",
+	is_flag=True,
+	help="Print the steps of the update, and the steps each runs after, without running them",
+)
 def update(
 	pull,
 	apps,
@@ -53,6 +58,7 @@ def update(
 	no_compile,
 	force,
 	reset,
+	dry_run,
 ):
 	from bench.utils.bench import update
 
@@ -68,12 +74,16 @@ def update(
 		compile=not no_compile,
 		force=force,
 		reset=reset,
+		dry_run=dry_run,
 	)
 
 
 @click.command("retry-upgrade", help="Retry a failed upgrade")
 @click.option("--version", default=5)
 def retry_upgrade(version):
+	from bench.app import pull_apps
+	from bench.utils.bench import build_assets, patch_sites, post_upgrade
+
 	pull_apps()
 	patch_sites()
 	build_assets()
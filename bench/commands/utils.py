@@ -172,7 +172,14 @@ def find_benches(location):
 )
 @click.argument("python", type=str)
 @click.option("--no-backup", "backup", is_flag=True, default=True)
-def migrate_env(python, backup=True):
+@click.option(
+	"--discard-old-env",
+	"discard",
+	is_flag=True,
+	default=False,
+	help="Remove the previous Virtual Environment instead of keeping it",
+)
+def migrate_env(python, backup=True, discard=False):
 	from bench.utils.bench import migrate_env
 
-	migrate_env(python=python, backup=backup)
+	migrate_env(python=python, backup=backup, discard=discard)
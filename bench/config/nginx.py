@@ -195,7 +195,6 @@ def prepare_sites(config, bench_path):
 
 def get_sites_with_config(bench_path):
 	from bench.bench import Bench
-	from bench.config.site_config import get_site_config
 
 	bench = Bench(bench_path)
 	sites = bench.sites
@@ -205,7 +204,7 @@ def get_sites_with_config(bench_path):
 	ret = []
 	for site in sites:
 		try:
-			site_config = get_site_config(site, bench_path=bench_path)
+			site_config = bench.site_registry.get_config(site)
 		except Exception as e:
 			strict_nginx = conf.get("strict_nginx")
 			if strict_nginx:
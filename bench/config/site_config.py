@@ -2,6 +2,7 @@
 import json
 import os
 from collections import defaultdict
+from copy import deepcopy
 
 
 def get_site_config(site, bench_path="."):
@@ -127,3 +128,100 @@ def get_domains_dict(domains):
 			domains_dict[d["domain"]] = d
 
 	return domains_dict
+
+
+class SiteRegistry:
+	"""Index of a bench's sites and their parsed site_config.json.
+
+	Listing the sites re-stats their configs, but only configs whose mtime or size
+	changed since they were last parsed are read again. Looking up a site's config
+	re-stats that config alone. The index is persisted in config/sites_index.json
+	so later runs start off warm.
+	"""
+
+	def __init__(self, bench_path="."):
+		self.bench_path = bench_path
+		self.sites_path = os.path.join(bench_path, "sites")
+		self.index_path = os.path.join(bench_path, "config", "sites_index.json")
+		self.index = None
+
+	@property
+	def sites(self):
+		return list(self.refresh())
+
+	def get_config(self, site):
+		"""Returns a copy of the site's config, raises if it's unreadable like get_site_config"""
+		if self.index is None or "sites" not in self.index:
+			self.refresh()
+
+		sites = self.index.setdefault("sites", {})
+		entry = self.read_entry(site, sites.get(site))
+		if entry:
+			sites[site] = entry
+
+		if not entry or entry["config"] is None:
+			return get_site_config(site, bench_path=self.bench_path)
+
+		return deepcopy(entry["config"])
+
+	def read_entry(self, site, entry=None):
+		"""Returns the site's entry, {"key", "config"}, parsing its config again only
+		if it changed since entry was made. None if the site has no config."""
+		config_path = os.path.join(self.sites_path, site, "site_config.json")
+		try:
+			stat = os.stat(config_path)
+		except OSError:
+			return None
+
+		key = [stat.st_mtime_ns, stat.st_size]
+		if entry and entry["key"] == key:
+			return entry
+
+		try:
+			with open(config_path) as f:
+				config = json.load(f)
+		except (OSError, ValueError):
+			# broken configs aren't cached, get_config raises for them
+			config = None
+
+		return {"key": key, "config": config}
+
+	def refresh(self):
+		from bench.utils import get_mtime, read_json
+
+		if self.index is None:
+			self.index = read_json(self.index_path, default={})
+
+		changed = False
+		sites_mtime = get_mtime(self.sites_path)
+
+		if sites_mtime != self.index.get("mtime") or "dirs" not in self.index:
+			self.index["mtime"] = sites_mtime
+			self.index["dirs"] = os.listdir(self.sites_path)
+			changed = True
+
+		cached_sites = self.index.get("sites", {})
+		sites = {}
+
+		for site in self.index["dirs"]:
+			entry = self.read_entry(site, cached_sites.get(site))
+			if not entry:
+				continue
+
+			changed = changed or entry is not cached_sites.get(site)
+			sites[site] = entry
+
+		if changed or len(sites) != len(cached_sites):
+			self.index["sites"] = sites
+			self.save()
+
+		return sites
+
+	def save(self):
+		from bench.utils import write_json
+
+		# site configs hold credentials, the index is written as 0600 like any temp file
+		try:
+			write_json(self.index_path, self.index)
+		except OSError:
+			pass
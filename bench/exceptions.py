@@ -30,6 +30,10 @@ class CannotUpdateReleaseBench(ValidationError):
 	pass
 
 
+class CyclicDependencyError(ValidationError):
+	pass
+
+
 class FeatureDoesNotExistError(CommandFailedError):
 	pass
 
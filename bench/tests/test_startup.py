@@ -0,0 +1,94 @@
+# imports - standard imports
+import getpass
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import unittest
+
+# imports - module imports
+from bench.utils import get_frappe_cmd_cache, paths_in_bench, update_frappe_cmd_cache
+
+# modules that individual bench commands need, but shouldn't be paid for on startup
+HEAVY_IMPORTS = ("git", "jinja2", "crontab", "requests", "semantic_version")
+BENCH_CLI = "import sys; from bench.cli import cli; sys.argv[0] = 'bench'; cli()"
+
+
+class TestStartup(unittest.TestCase):
+	"""Benchmarks bench's startup for commands that must stay cheap. Times are
+	printed for comparison across revisions, while the imports made on the way
+	are asserted on since they account for most of the startup time.
+	"""
+
+	def setUp(self):
+		self.bench_path = os.path.abspath("./sandbox-startup")
+		self.frappe_commands = ["migrate", "backup"]
+
+		for folder in paths_in_bench + ("env/bin",):
+			os.makedirs(os.path.join(self.bench_path, folder), exist_ok=True)
+
+		with open(os.path.join(self.bench_path, "sites", "apps.txt"), "w") as f:
+			f.write("frappe")
+
+		with open(os.path.join(self.bench_path, "sites", "common_site_config.json"), "w") as f:
+			json.dump({"frappe_user": getpass.getuser()}, f)
+
+		# stand-in for the env's python: echoes the arguments it's exec'd with
+		python = os.path.join(self.bench_path, "env", "bin", "python")
+		with open(python, "w") as f:
+			f.write('#!/bin/sh\necho "$@"\n')
+		os.chmod(python, 0o755)
+
+		cache = get_frappe_cmd_cache(bench_path=self.bench_path)
+		cache["commands"] = self.frappe_commands
+		update_frappe_cmd_cache(cache, bench_path=self.bench_path)
+
+	def tearDown(self):
+		shutil.rmtree(self.bench_path, ignore_errors=True)
+
+	def run_bench(self, *args):
+		start = time.perf_counter()
+		out = subprocess.run(
+			[sys.executable, "-X", "importtime", "-c", BENCH_CLI, *args],
+			cwd=self.bench_path,
+			env=dict(os.environ, BENCH_DEVELOPER="1"),
+			stdout=subprocess.PIPE,
+			stderr=subprocess.PIPE,
+			universal_newlines=True,
+		)
+		elapsed = time.perf_counter() - start
+		print(f"\n`bench {' '.join(args)}` started in {elapsed:.3f}s")
+
+		imported = {
+			line.rsplit("|", 1)[-1].strip()
+			for line in out.stderr.splitlines()
+			if line.startswith("import time:")
+		}
+		return out, imported
+
+	def assert_not_imported(self, imported):
+		for module in HEAVY_IMPORTS:
+			self.assertNotIn(module, imported)
+
+	def test_version(self):
+		out, imported = self.run_bench("--version")
+		self.assertEqual(out.returncode, 0)
+		self.assert_not_imported(imported)
+
+	def test_forwarded_frappe_command(self):
+		out, imported = self.run_bench("--site", "all", "migrate")
+		self.assertIn("frappe.utils.bench_helper frappe --site all migrate", out.stdout)
+		self.assert_not_imported(imported)
+		# dispatching a frappe command shouldn't load bench's own commands
+		self.assertNotIn("bench.commands.make", imported)
+		self.assertNotIn("bench.bench", imported)
+
+	def test_lazy_commands(self):
+		from bench.commands import bench_command
+
+		for name in bench_command.list_commands(None):
+			command = bench_command.get_command(None, name)
+			self.assertIsNotNone(command)
+			self.assertIn(name, command.name)
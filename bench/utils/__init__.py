@@ -5,10 +5,10 @@ import os
 import re
 import subprocess
 import sys
-from functools import lru_cache
-from glob import glob
+import threading
+from contextlib import contextmanager
 from shlex import split
-from typing import List, Tuple
+from typing import List, Tuple, Union
 
 # imports - third party imports
 import click
@@ -26,6 +26,7 @@ paths_in_app = ("hooks.py", "modules.txt", "patches.txt")
 paths_in_bench = ("apps", "sites", "config", "logs", "config/pids")
 sudoers_file = "/etc/sudoers.d/frappe"
 UNSET_ARG = object()
+thread_local = threading.local()
 
 
 def is_bench_directory(directory=os.path.curdir):
@@ -39,19 +40,145 @@ def is_bench_directory(directory=os.path.curdir):
 
 
 def is_frappe_app(directory: str) -> bool:
-	is_frappe_app = True
+	return bool(get_app_module_path(directory))
 
-	for folder in paths_in_app:
-		if not is_frappe_app:
-			break
 
-		path = glob(os.path.join(directory, "**", folder))
-		is_frappe_app = is_frappe_app and path
+def get_app_module_path(directory: str) -> Union[str, None]:
+	"""Returns the path of the app's python module, the folder holding its hooks.py,
+	modules.txt & patches.txt. Only the app folder, the module named after it and
+	the app folder's direct children are checked.
+	"""
+
+	def is_app_module(path):
+		return all(os.path.exists(os.path.join(path, x)) for x in paths_in_app)
+
+	candidates = [os.path.join(directory, os.path.basename(directory)), directory]
+	for path in candidates:
+		if is_app_module(path):
+			return path
+
+	try:
+		with os.scandir(directory) as entries:
+			children = sorted(
+				entry.path
+				for entry in entries
+				if entry.is_dir()
+				and not entry.name.startswith(".")
+				and entry.name != "node_modules"
+				and entry.path not in candidates
+			)
+	except OSError:
+		return None
+
+	for path in children:
+		if is_app_module(path):
+			return path
+
+
+def get_frappe_apps(bench_path=".") -> List[str]:
+	"""Lists the Frappe apps in the bench's apps folder.
+
+	Detected apps are recorded in config/apps_manifest.json with the mtimes of
+	the apps folder, the app's folder and its module. While those are unchanged
+	listing apps only needs a few stat calls.
+	"""
+	apps_path = os.path.join(bench_path, "apps")
+	manifest_path = os.path.join(bench_path, "config", "apps_manifest.json")
+	manifest = read_json(manifest_path, default={})
+	cached_apps = manifest.get("apps", {})
+
+	apps_mtime = get_mtime(apps_path)
+	if apps_mtime is not None and apps_mtime == manifest.get("mtime"):
+		dirs = manifest.get("dirs", [])
+	else:
+		dirs = os.listdir(apps_path)
+
+	apps, found_apps = [], {}
+
+	for app in dirs:
+		app_path = os.path.join(apps_path, app)
+		cached = cached_apps.get(app)
+
+		if cached and cached["mtimes"] == [
+			get_mtime(app_path),
+			get_mtime(os.path.join(app_path, cached["module"])),
+		]:
+			module = cached["module"]
+		else:
+			# folders that aren't apps aren't recorded, they're rare and checked each time
+			module_path = get_app_module_path(app_path)
+			module = os.path.relpath(module_path, app_path) if module_path else None
+
+		if module:
+			apps.append(app)
+			found_apps[app] = {
+				"module": module,
+				"mtimes": [get_mtime(app_path), get_mtime(os.path.join(app_path, module))],
+			}
+
+	new_manifest = {"mtime": apps_mtime, "dirs": dirs, "apps": found_apps}
+	if new_manifest != manifest:
+		try:
+			write_json(manifest_path, new_manifest)
+		except OSError:
+			pass
+
+	return apps
+
 
-	return bool(is_frappe_app)
+def disk_cache(name: str):
+	"""Memoizes the function's results in the process and, for
+	`dependency_cache_ttl` seconds (default an hour), in ~/.cache/bench/<name>.json
+	so they're shared by later runs & benches. Results must be JSON serializable
+	and calls that raise aren't cached.
+	"""
+	from functools import wraps
+
+	def decorator(func):
+		memo = {}
+		lock = threading.Lock()
+
+		@wraps(func)
+		def wrapper(*args, **kwargs):
+			from time import time
+
+			from bench.config.common_site_config import get_config
+
+			key = json.dumps([args, kwargs], sort_keys=True)
+			if key in memo:
+				return memo[key]
+
+			path = get_cache_dir(f"{name}.json")
+			ttl = get_config(".").get("dependency_cache_ttl", 3600)
+			entry = read_json(path, default={}).get(key)
+
+			if entry and time() - entry["cached_at"] < ttl:
+				value = entry["value"]
+			else:
+				value = func(*args, **kwargs)
+
+				with lock:
+					now = time()
+					cache = {
+						k: v for k, v in read_json(path, default={}).items() if now - v["cached_at"] < ttl
+					}
+					cache[key] = {"cached_at": now, "value": value}
+					try:
+						os.makedirs(os.path.dirname(path), exist_ok=True)
+						write_json(path, cache)
+					except OSError:
+						pass
+
+			memo[key] = value
+			return value
 
+		wrapper.cache_clear = memo.clear
+		return wrapper
 
-@lru_cache(maxsize=None)
+	return decorator
+
+
+@disk_cache("valid_branches")
 def is_valid_frappe_branch(frappe_path: str, frappe_branch: str):
 	"""Check if a branch exists in a repo. Throws InvalidRemoteException if branch is not found
 
@@ -105,30 +232,142 @@ def log(message, level=0, no_log=False, stderr=False):
 		click.secho(f"{prefix}: {message}", fg=color, err=stderr)
 
 
-def check_latest_version():
+def check_latest_version(bench_path="."):
+	"""Notifies if a newer bench release is on PyPI, as of the last check.
+
+	Runs at exit of CLI commands so it must never block. The latest version is
+	looked up by a detached process at most once every `version_check_ttl`
+	seconds and the result is stored for the next run to report. Set
+	`disable_version_check` in common_site_config.json to turn this off.
+	"""
 	if VERSION.endswith("dev"):
 		return
 
-	import requests
+	from time import time
+
+	from bench.config.common_site_config import get_config
+
+	config = get_config(bench_path)
+	if config.get("disable_version_check"):
+		return
+
+	state = read_json(get_cache_dir("version_check.json"), default={})
+	ttl = config.get("version_check_ttl", 86400)
+
+	if time() - state.get("checked_at", 0) > ttl:
+		spawn_detached(
+			[
+				sys.executable,
+				"-c",
+				"from bench.utils import update_latest_version; update_latest_version()",
+			]
+		)
+
+	if not state.get("version"):
+		return
+
 	from semantic_version import Version
 
 	try:
-		pypi_request = requests.get("https://pypi.org/pypi/frappe-bench/json")
+		pypi_version = Version(state["version"])
+		local_version = Version(VERSION)
+	except ValueError:
+		return
+
+	if pypi_version > local_version:
+		log(
+			f"A newer version of bench is available: {local_version} → {pypi_version}",
+			stderr=True,
+		)
+
+
+def update_latest_version(timeout=10):
+	"""Looks up the latest bench release on PyPI for `check_latest_version`"""
+	from time import time
+
+	state_file = get_cache_dir("version_check.json")
+	state = read_json(state_file, default={})
+	# record the attempt up front, so commands run meanwhile don't start another
+	# check, and offline hosts don't retry on every run
+	state["checked_at"] = time()
+
+	try:
+		os.makedirs(os.path.dirname(state_file), exist_ok=True)
+		write_json(state_file, state)
+
+		import requests
+
+		pypi_request = requests.get("https://pypi.org/pypi/frappe-bench/json", timeout=timeout)
+		if pypi_request.status_code == 200:
+			state["version"] = pypi_request.json().get("info").get("version")
 	except Exception:
 		# Exceptions thrown are defined in requests.exceptions
 		# ignore checking on all Exceptions
 		return
 
-	if pypi_request.status_code == 200:
-		pypi_version_str = pypi_request.json().get("info").get("version")
-		pypi_version = Version(pypi_version_str)
-		local_version = Version(VERSION)
+	try:
+		write_json(state_file, state)
+	except OSError:
+		pass
 
-		if pypi_version > local_version:
-			log(
-				f"A newer version of bench is available: {local_version} → {pypi_version}",
-				stderr=True,
-			)
+
+def spawn_detached(cmd, cwd=None):
+	"""Starts `cmd` in its own session, not waiting on or attached to it"""
+	try:
+		return subprocess.Popen(
+			cmd,
+			cwd=cwd,
+			stdin=subprocess.DEVNULL,
+			stdout=subprocess.DEVNULL,
+			stderr=subprocess.DEVNULL,
+			start_new_session=True,
+		)
+	except OSError:
+		return None
+
+
+def get_cache_dir(*paths):
+	"""Per-user cache directory shared by all benches on the host"""
+	cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+	return os.path.join(cache_home, "bench", *paths)
+
+
+def get_shared_cache_dir(key: str, default_subdir: str, bench_path=".") -> str:
+	"""Returns the directory of a cache the benches on the host can share, if it's
+	enabled by setting `key` in common_site_config.json to a path, relative to the
+	bench, or to true to use the per-user cache in ~/.cache/bench/<default_subdir>.
+	"""
+	from bench.config.common_site_config import get_config
+
+	path = get_config(bench_path).get(key)
+
+	if not path:
+		return None
+
+	if path is True:
+		path = get_cache_dir(default_subdir)
+	else:
+		path = os.path.join(bench_path, os.path.expanduser(path))
+
+	path = os.path.abspath(path)
+	os.makedirs(path, exist_ok=True)
+	return path
+
+
+@contextmanager
+def file_lock(path: str):
+	"""Holds an exclusive lock on the file at path, serializing the changes benches,
+	and their processes, make to what they share"""
+	import fcntl
+
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+
+	with open(path, "w") as lock_file:
+		fcntl.flock(lock_file, fcntl.LOCK_EX)
+		try:
+			yield
+		finally:
+			fcntl.flock(lock_file, fcntl.LOCK_UN)
 
 
 def pause_exec(seconds=10):
@@ -145,13 +384,30 @@ def exec_cmd(cmd, cwd=".", env=None, _raise=True):
 	if env:
 		env.update(os.environ.copy())
 
-	click.secho(f"$ {cmd}", fg="bright_black")
+	# commands run by parallel jobs have their output prefixed, see run_parallel
+	prefix = getattr(thread_local, "output_prefix", "")
+	click.secho(f"{prefix}$ {cmd}", fg="bright_black")
 
 	cwd_info = f"cd {cwd} && " if cwd != "." else ""
 	cmd_log = f"{cwd_info}{cmd}"
 	logger.debug(cmd_log)
 	spl_cmd = split(cmd)
-	return_code = subprocess.call(spl_cmd, cwd=cwd, universal_newlines=True, env=env)
+
+	if prefix:
+		process = subprocess.Popen(
+			spl_cmd,
+			cwd=cwd,
+			env=env,
+			stdout=subprocess.PIPE,
+			stderr=subprocess.STDOUT,
+			universal_newlines=True,
+		)
+		for line in process.stdout:
+			click.echo(f"{prefix}{line}", nl=False)
+		return_code = process.wait()
+	else:
+		return_code = subprocess.call(spl_cmd, cwd=cwd, universal_newlines=True, env=env)
+
 	if return_code:
 		logger.warning(f"{cmd_log} executed with exit code {return_code}")
 		if _raise:
@@ -159,6 +415,53 @@ def exec_cmd(cmd, cwd=".", env=None, _raise=True):
 	return return_code
 
 
+def get_max_workers(bench_path=".") -> int:
+	"""Number of jobs bench runs at once, set by `max_parallel_jobs` in common_site_config.json"""
+	from bench.config.common_site_config import get_config
+
+	max_workers = get_config(bench_path).get("max_parallel_jobs")
+	if max_workers:
+		return max(int(max_workers), 1)
+
+	# jobs are mostly spent waiting on git, pip & the network
+	return min(8, (os.cpu_count() or 1) + 4)
+
+
+def run_parallel(func, items, max_workers=None, bench_path=".") -> Tuple[dict, dict]:
+	"""Calls func(item) for every item on a bounded pool of threads.
+
+	Output of the commands run via exec_cmd is prefixed with the item it's for.
+	Returns the results & the exceptions raised, both keyed by item.
+	"""
+	from concurrent.futures import ThreadPoolExecutor
+
+	def run(item):
+		thread_local.output_prefix = f"[{item}] "
+		try:
+			return func(item)
+		finally:
+			thread_local.output_prefix = ""
+
+	results, errors = {}, {}
+	items = list(items)
+
+	if not items:
+		return results, errors
+
+	max_workers = min(max_workers or get_max_workers(bench_path), len(items))
+
+	with ThreadPoolExecutor(max_workers=max_workers) as executor:
+		futures = [(item, executor.submit(run, item)) for item in items]
+
+		for item, future in futures:
+			try:
+				results[item] = future.result()
+			except Exception as e:
+				errors[item] = e
+
+	return results, errors
+
+
 def which(executable: str, raise_err: bool = False) -> str:
 	from shutil import which
 
@@ -232,8 +535,16 @@ def is_root():
 def run_frappe_cmd(*args, **kwargs):
 	from bench.cli import from_command_line
 	from bench.utils.bench import get_env_cmd
+	from bench.utils.daemon import forward_to_helper
 
 	bench_path = kwargs.get("bench_path", ".")
+
+	return_code = forward_to_helper(("frappe",) + args, bench_path=bench_path)
+	if return_code is not None:
+		if return_code > 0:
+			sys.exit(return_code)
+		return
+
 	f = get_env_cmd("python", bench_path=bench_path)
 	sites_dir = os.path.join(bench_path, "sites")
 
@@ -386,14 +697,19 @@ def find_parent_bench(path: str) -> str:
 def get_env_frappe_commands(bench_path=".") -> List:
 	"""Caches all available commands (even custom apps) via Frappe
 	Default caching behaviour: generated the first time any command (for a specific bench directory)
+	is run and stored in config/frappe_commands.json until the bench's env or apps change
 	"""
 	from bench.utils.bench import get_env_cmd
 
+	cache = get_frappe_cmd_cache(bench_path=bench_path)
+	if "commands" in cache:
+		return cache["commands"]
+
 	python = get_env_cmd("python", bench_path=bench_path)
 	sites_path = os.path.join(bench_path, "sites")
 
 	try:
-		return json.loads(
+		commands = json.loads(
 			get_cmd_output(
 				f"{python} -m frappe.utils.bench_helper get-frappe-commands", cwd=sites_path
 			)
@@ -402,10 +718,138 @@ def get_env_frappe_commands(bench_path=".") -> List:
 	except subprocess.CalledProcessError as e:
 		if hasattr(e, "stderr"):
 			print(e.stderr)
+		return []
+
+	cache["commands"] = commands
+	update_frappe_cmd_cache(cache, bench_path=bench_path)
+
+	return commands
 
-	return []
 
+def get_frappe_cmd_cache(bench_path=".") -> dict:
+	"""Returns the cached Frappe commands & help text of the bench. Stale caches,
+	ie generated for a different env or set of apps, are discarded.
+	"""
+	cache_key = get_frappe_cmd_cache_key(bench_path=bench_path)
+	cache = read_json(os.path.join(bench_path, "config", "frappe_commands.json"), default={})
+
+	if cache.get("key") != cache_key:
+		return {"key": cache_key}
+
+	return cache
+
+
+def update_frappe_cmd_cache(cache: dict, bench_path="."):
+	try:
+		write_json(os.path.join(bench_path, "config", "frappe_commands.json"), cache)
+	except OSError:
+		# caching is best effort, eg: config directory may not be writable
+		pass
+
+
+def get_frappe_cmd_cache_key(bench_path=".") -> str:
+	"""Fingerprint of everything that decides the commands Frappe exposes: the env's
+	interpreter, sites/apps.txt and the checked out state of each installed app.
+	Only stats files & reads git refs - no processes are spawned.
+	"""
+	from hashlib import sha256
+
+	from bench.utils.bench import get_env_cmd
 
+	python = get_env_cmd("python", bench_path=bench_path)
+	apps_txt = os.path.join(bench_path, "sites", "apps.txt")
+	key = [
+		python,
+		get_mtime(python),
+		get_mtime(os.path.join(bench_path, "env", "pyvenv.cfg")),
+		get_mtime(apps_txt),
+	]
+
+	try:
+		with open(apps_txt) as f:
+			apps = f.read().split()
+	except OSError:
+		apps = []
+
+	for app in apps:
+		app_path = os.path.join(bench_path, "apps", app)
+		key.extend(
+			(
+				app,
+				get_mtime(app_path),
+				get_git_head(app_path),
+				# custom commands may be added without committing them
+				get_mtime(os.path.join(app_path, app, "commands.py")),
+				get_mtime(os.path.join(app_path, app, "commands")),
+			)
+		)
+
+	return sha256(json.dumps(key).encode()).hexdigest()
+
+
+def get_mtime(path: str) -> Union[int, None]:
+	try:
+		return os.stat(path).st_mtime_ns
+	except OSError:
+		return None
+
+
+def get_git_head(repo_path: str) -> str:
+	"""Returns the commit HEAD points to by reading the repo's .git directory
+	instead of running `git rev-parse HEAD`
+	"""
+	git_dir = os.path.join(repo_path, ".git")
+
+	try:
+		with open(os.path.join(git_dir, "HEAD")) as f:
+			head = f.read().strip()
+	except OSError:
+		return ""
+
+	if not head.startswith("ref: "):
+		# detached HEAD
+		return head
+
+	ref = head[len("ref: ") :]
+
+	try:
+		with open(os.path.join(git_dir, ref)) as f:
+			return f.read().strip()
+	except OSError:
+		pass
+
+	try:
+		with open(os.path.join(git_dir, "packed-refs")) as f:
+			for line in f:
+				if line.rstrip().endswith(f" {ref}"):
+					return line.split()[0]
+	except OSError:
+		pass
+
+	return ref
+
+
+def read_json(path: str, default=None):
+	try:
+		with open(path) as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		return default
+
+
+def write_json(path: str, data, indent=None):
+	"""Writes data to path atomically, so concurrent readers never see a partial file"""
+	from tempfile import NamedTemporaryFile
+
+	with NamedTemporaryFile(
+		"w", dir=os.path.dirname(path) or ".", prefix=".tmp-", delete=False
+	) as f:
+		json.dump(data, f, indent=indent)
+
+	os.replace(f.name, path)
+
+
+@disk_cache("orgs")
 def find_org(org_repo):
 	import requests
 
@@ -523,6 +967,12 @@ class _dict(dict):
 		return _dict(dict(self).copy())
 
 
+def get_bench_apps(bench_path="."):
+	from bench.bench import Bench
+
+	return Bench(bench_path).apps
+
+
 def get_cmd_from_sysargv():
 	"""Identify and segregate tokens to options and command
 
@@ -531,9 +981,6 @@ def get_cmd_from_sysargv():
 	Actual command run: migrate
 
 	"""
-	# context is passed as options to frappe's bench_helper
-	from bench.bench import Bench
-
 	frappe_context = _dict(params={"--site"}, flags={"--verbose", "--profile", "--force"})
 	cmd_from_ctx = None
 	sys_argv = sys.argv[1:]
@@ -551,7 +998,13 @@ def get_cmd_from_sysargv():
 			skip_next = True
 			continue
 
-		if sys_argv.index(arg) == 0 and arg in Bench(".").apps:
+		if (
+			sys_argv.index(arg) == 0
+			and not arg.startswith("-")
+			# avoid initializing the Bench unless the argument could be an app
+			and os.path.isdir(os.path.join("apps", arg))
+			and arg in get_bench_apps(".")
+		):
 			continue
 
 		cmd_from_ctx = arg
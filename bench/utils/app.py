@@ -4,7 +4,9 @@ import pathlib
 import re
 import sys
 import subprocess
-from typing import List
+from collections import OrderedDict
+from glob import glob
+from typing import Dict, List, Union
 from functools import lru_cache
 
 # imports - module imports
@@ -14,11 +16,37 @@ from bench.exceptions import (
 	CommandFailedError,
 	VersionNotFound,
 )
-from bench.app import get_repo_dir
-
-
-def is_version_upgrade(app="frappe", bench_path=".", branch=None):
-	upstream_version = get_upstream_version(app=app, branch=branch, bench_path=bench_path)
+from bench.app import get_repo_dir, get_unshallow_flags
+from bench.utils import disk_cache
+
+# files declaring an app's dependencies, fingerprinted to tell if they changed
+DEPENDENCY_FILES = {
+	"python": (
+		"pyproject.toml",
+		"setup.py",
+		"setup.cfg",
+		"requirements.txt",
+		"dev-requirements.txt",
+	),
+	"node": ("package.json", "yarn.lock"),
+}
+# files at the root of an app that are inputs of its assets build, with its public folder
+ASSET_FILES = ("package.json", "yarn.lock", "package-lock.json", "pnpm-lock.yaml")
+# folders at the root of an app that are inputs of its assets build, like frappe's build config
+ASSET_DIRS = ("esbuild",)
+# folders that aren't build inputs, even under the ones that are
+ASSET_EXCLUDED_DIRS = ("dist", "node_modules", "__pycache__")
+
+
+def is_version_upgrade(app="frappe", bench_path=".", branch=None, plan=None, fetch=True):
+	"""Checks if the app's upstream branch is of a newer major version. With an
+	update plan from get_update_plan, it's used instead of fetching again."""
+	if plan and "upstream_head" in plan.get(app, {}):
+		upstream_version = plan[app]["upstream_version"]
+	else:
+		upstream_version = get_upstream_version(
+			app=app, branch=branch, bench_path=bench_path, fetch=fetch
+		)
 
 	if not upstream_version:
 		raise InvalidBranchException(
@@ -37,41 +65,63 @@ def is_version_upgrade(app="frappe", bench_path=".", branch=None):
 def switch_branch(branch, apps=None, bench_path=".", upgrade=False, check_upgrade=True):
 	import git
 	from bench.bench import Bench
-	from bench.utils import log, exec_cmd
+	from bench.utils import exec_cmd, get_cmd_output, log, run_parallel
 	from bench.utils.bench import (
 		build_assets,
 		patch_sites,
 		post_upgrade,
 	)
+	from bench.utils.mirror import update_mirror
 	from bench.utils.system import backup_all_sites
 
 	apps_dir = os.path.join(bench_path, "apps")
 	version_upgrade = (False,)
 	switched_apps = []
+	unshallow_flags = get_unshallow_flags(Bench(bench_path).clone_strategy)
 
 	if not apps:
 		apps = [
 			name for name in os.listdir(apps_dir) if os.path.isdir(os.path.join(apps_dir, name))
 		]
+	apps = list(apps)
 
-	for app in apps:
-		app_dir = os.path.join(apps_dir, app)
-
-		if not os.path.exists(app_dir):
-			log(f"{app} does not exist!", level=2)
-			continue
+	for app in [app for app in apps if not os.path.exists(os.path.join(apps_dir, app))]:
+		log(f"{app} does not exist!", level=2)
+		apps.remove(app)
 
-		repo = git.Repo(app_dir)
+	def fetch(app):
+		app_dir = os.path.join(apps_dir, app)
 		unshallow_flag = os.path.exists(os.path.join(app_dir, ".git", "shallow"))
+		unshallow = f" {unshallow_flags}" if unshallow_flag else ""
 		log(f"Fetching upstream {'unshallow ' if unshallow_flag else ''}for {app}")
 
 		exec_cmd("git remote set-branches upstream  '*'", cwd=app_dir)
-		exec_cmd(
-			f"git fetch --all{' --unshallow' if unshallow_flag else ''} --quiet", cwd=app_dir
-		)
+
+		upstream_url = get_cmd_output("git remote get-url upstream", cwd=app_dir, _raise=False)
+		mirror = update_mirror(upstream_url, bench_path=bench_path) if upstream_url else None
+
+		if mirror:
+			exec_cmd(
+				f"git fetch{unshallow} --quiet {mirror}"
+				" '+refs/heads/*:refs/remotes/upstream/*' '+refs/tags/*:refs/tags/*'",
+				cwd=app_dir,
+			)
+		else:
+			exec_cmd(f"git fetch --all{unshallow} --quiet", cwd=app_dir)
+
+	# every app is fetched upfront, concurrently, and only then switched one by one
+	_, errors = run_parallel(fetch, apps, bench_path=bench_path)
+	for error in errors.values():
+		raise error
+
+	for app in apps:
+		app_dir = os.path.join(apps_dir, app)
+		repo = git.Repo(app_dir)
 
 		if check_upgrade:
-			version_upgrade = is_version_upgrade(app=app, bench_path=bench_path, branch=branch)
+			version_upgrade = is_version_upgrade(
+				app=app, bench_path=bench_path, branch=branch, fetch=False
+			)
 			if version_upgrade[0] and not upgrade:
 				log(
 					f"Switching to {branch} will cause upgrade from"
@@ -112,6 +162,48 @@ def switch_to_develop(apps=None, bench_path=".", upgrade=True):
 	switch_branch("develop", apps=apps, bench_path=bench_path, upgrade=upgrade)
 
 
+def get_changed_python_files(app, old_commit, new_commit, bench_path="."):
+	"""Returns the python files added or modified & removed between two commits,
+	as paths relative to the app. Renames are listed as a removal and an addition,
+	which saves git fetching file contents in blobless clones to detect them."""
+	from bench.utils import get_cmd_output
+
+	repo_dir = get_repo_dir(app, bench_path=bench_path)
+	changes = get_cmd_output(
+		f"git diff --name-status --no-renames {old_commit} {new_commit} -- '*.py'",
+		cwd=repo_dir,
+	)
+	changed, removed = [], []
+
+	for line in changes.splitlines():
+		status, _, path = line.partition("\t")
+		(removed if status == "D" else changed).append(path)
+
+	return changed, removed
+
+
+def remove_stale_bytecode(app, removed_files, bench_path="."):
+	"""Removes the .pyc files of removed modules, and the __pycache__ & package
+	folders left behind only because of them"""
+	repo_dir = get_repo_dir(app, bench_path=bench_path)
+
+	for path in removed_files:
+		module_dir, filename = os.path.split(os.path.join(repo_dir, path))
+		module_name = filename[: -len(".py")]
+		pycache_dir = os.path.join(module_dir, "__pycache__")
+
+		for pyc in [os.path.join(module_dir, f"{module_name}.pyc")] + glob(
+			os.path.join(pycache_dir, f"{module_name}.*.pyc")
+		):
+			if os.path.exists(pyc):
+				os.remove(pyc)
+
+		# an empty folder would be importable as a namespace package
+		for folder in (pycache_dir, module_dir):
+			if os.path.isdir(folder) and not os.listdir(folder):
+				os.rmdir(folder)
+
+
 def get_version_from_string(contents, field="__version__"):
 	match = re.search(
 		r"^(\s*%s\s*=\s*['\\\"])(.+?)(['\"])" % field, contents, flags=(re.S | re.M)
@@ -133,28 +225,34 @@ def get_develop_version(app, bench_path="."):
 		return get_version_from_string(f.read(), field="develop_version")
 
 
-def get_upstream_version(app, branch=None, bench_path="."):
+def get_upstream_version(app, branch=None, bench_path=".", fetch=True):
+	"""Returns the version of the app on its upstream branch. Without fetching,
+	`branch` is read as it was last fetched, it may also be a commit."""
 	repo_dir = get_repo_dir(app, bench_path=bench_path)
 	if not branch:
 		branch = get_current_branch(app, bench_path=bench_path)
 
-	try:
-		subprocess.call(
-			f"git fetch --depth=1 --no-tags upstream {branch}", shell=True, cwd=repo_dir
-		)
-	except CommandFailedError:
-		raise InvalidRemoteException(f"Failed to fetch from remote named upstream for {app}")
+	if fetch:
+		try:
+			subprocess.call(
+				f"git fetch --depth=1 --no-tags upstream {branch}", shell=True, cwd=repo_dir
+			)
+		except CommandFailedError:
+			raise InvalidRemoteException(f"Failed to fetch from remote named upstream for {app}")
+
+	# remote branches are resolved through upstream, commits as they are
+	ref = f"upstream/{branch}" if fetch or not re.fullmatch(r"[0-9a-f]{40}", branch) else branch
 
 	try:
 		contents = subprocess.check_output(
-			f"git show upstream/{branch}:{app}/__init__.py",
+			f"git show {ref}:{app}/__init__.py",
 			shell=True,
 			cwd=repo_dir,
 			stderr=subprocess.STDOUT,
 		)
 		contents = contents.decode("utf-8")
 	except subprocess.CalledProcessError as e:
-		if b"Invalid object" in e.output:
+		if b"invalid object" in e.output.lower():
 			return None
 		else:
 			raise
@@ -180,6 +278,8 @@ def get_required_deps(org, name, branch, deps="hooks.py"):
 	import requests
 	import base64
 
+	from bench.utils import log
+
 	git_api_url = f"https://api.github.com/repos/{org}/{name}/contents/{name}/{deps}"
 	params = {"ref": branch or "develop"}
 	res = requests.get(url=git_api_url, params=params).json()
@@ -188,11 +288,30 @@ def get_required_deps(org, name, branch, deps="hooks.py"):
 		git_url = (
 			f"https://raw.githubusercontent.com/{org}/{name}/{params['ref']}/{name}/{deps}"
 		)
-		return requests.get(git_url).text
+		res = requests.get(git_url)
+
+		if res.status_code == 404:
+			# like private apps & those not hosted on GitHub
+			log(f"Couldn't find {deps} of {org}/{name}, assuming it has no dependencies", level=3)
+			return ""
+
+		# other errors shouldn't be read, and cached, as an app without dependencies
+		res.raise_for_status()
+		return res.text
 
 	return base64.decodebytes(res["content"].encode()).decode()
 
 
+@disk_cache("required_apps")
+def get_required_apps(org, name, branch) -> List:
+	"""Returns the `required_apps` in hooks.py of the app on the remote branch"""
+	try:
+		return required_apps_from_hooks(get_required_deps(org, name, branch))
+	except TypeError:
+		# hooks.py doesn't set required_apps
+		return []
+
+
 def required_apps_from_hooks(required_deps: str, local: bool = False) -> List:
 	import ast
 
@@ -290,3 +409,98 @@ def get_current_version(app, bench_path="."):
 			current_version = get_version_from_string(f.read(), field="version")
 
 	return current_version
+
+
+def get_dependency_fingerprints(app: str, bench_path=".") -> Dict[str, str]:
+	"""Returns hashes of the files declaring the app's python & node dependencies,
+	{"python": ..., "node": ...}. The python one also changes when the env is
+	recreated, as its dependencies have to be installed again then.
+	"""
+	import hashlib
+
+	from bench.utils import get_mtime
+
+	app_path = os.path.join(bench_path, "apps", app)
+	fingerprints = {}
+
+	for kind, files in DEPENDENCY_FILES.items():
+		digest = hashlib.sha256()
+
+		if kind == "python":
+			pyvenv_cfg = os.path.join(bench_path, "env", "pyvenv.cfg")
+			digest.update(str(get_mtime(pyvenv_cfg)).encode())
+
+		for file in files:
+			try:
+				with open(os.path.join(app_path, file), "rb") as f:
+					content = f.read()
+			except OSError:
+				continue
+			digest.update(f"{file}\0{len(content)}\0".encode())
+			digest.update(content)
+
+		fingerprints[kind] = digest.hexdigest()
+
+	return fingerprints
+
+
+def get_build_script(app: str, bench_path=".") -> Union[str, None]:
+	"""Returns the app's own `build` script from its package.json, which apps with
+	separate frontends, like hrms or helpdesk, build those with"""
+	from bench.utils import read_json
+
+	package_json = read_json(os.path.join(bench_path, "apps", app, "package.json"), default={})
+	scripts = package_json.get("scripts") if isinstance(package_json, dict) else None
+	return (scripts or {}).get("build")
+
+
+def get_asset_source_dirs(app: str, bench_path=".") -> List[str]:
+	"""Returns the folders the app's assets are built from: its public folder, its
+	build config and the folders its build script builds in, like `cd frontend &&
+	yarn build`. If the build script's folders can't be told, that's the whole app.
+	"""
+	from bench.utils import get_app_module_path
+
+	app_path = os.path.join(bench_path, "apps", app)
+	module_path = get_app_module_path(app_path) or os.path.join(app_path, app)
+	dirs = [os.path.join(module_path, "public")]
+	dirs.extend(os.path.join(app_path, d) for d in ASSET_DIRS)
+
+	build_script = get_build_script(app, bench_path)
+	if build_script:
+		script_dirs = [
+			os.path.normpath(os.path.join(app_path, d))
+			for d in re.findall(r"\bcd\s+([\w./-]+)", build_script)
+		]
+		script_dirs = [d for d in script_dirs if d.startswith(os.path.normpath(app_path) + os.sep)]
+		dirs.extend(script_dirs or [app_path])
+
+	return [d for d in dirs if os.path.isdir(d)]
+
+
+def get_assets_fingerprint(app: str, bench_path=".") -> str:
+	"""Returns a hash of the sources the app's assets are built from: the folders of
+	get_asset_source_dirs, except the built files & dependencies in them, and the
+	app's package.json & lockfiles
+	"""
+	import hashlib
+
+	app_path = os.path.join(bench_path, "apps", app)
+	files = [os.path.join(app_path, file) for file in ASSET_FILES]
+
+	for source_dir in get_asset_source_dirs(app, bench_path):
+		for root, dirs, filenames in os.walk(source_dir):
+			dirs[:] = sorted(d for d in dirs if d not in ASSET_EXCLUDED_DIRS and d[0] != ".")
+			files.extend(os.path.join(root, f) for f in sorted(filenames))
+
+	digest = hashlib.sha256()
+	for path in OrderedDict.fromkeys(files):
+		try:
+			with open(path, "rb") as f:
+				content = f.read()
+		except OSError:
+			continue
+		digest.update(f"{os.path.relpath(path, app_path)}\0{len(content)}\0".encode())
+		digest.update(content)
+
+	return digest.hexdigest()
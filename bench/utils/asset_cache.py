@@ -0,0 +1,235 @@
+# imports - standard imports
+import hashlib
+import os
+import shutil
+import time
+from typing import Dict, List
+
+# imports - module imports
+from bench.utils import (
+	file_lock,
+	get_app_module_path,
+	get_cmd_output,
+	get_shared_cache_dir,
+	read_json,
+	write_json,
+)
+from bench.utils.bench import copy_tree
+
+# manifests mapping bundles to their built files, in sites/assets
+ASSET_MANIFESTS = ("assets.json", "assets-rtl.json")
+
+
+def get_asset_cache_dir(bench_path=".") -> str:
+	"""Returns the cache of built assets shared by the benches on the host, if enabled.
+
+	Set `asset_cache` in common_site_config.json to a path, or to true to use the
+	per-user cache in ~/.cache/bench/assets.
+	"""
+	return get_shared_cache_dir("asset_cache", "assets", bench_path)
+
+
+def is_asset_cache_enabled(bench_path=".") -> bool:
+	"""Only apps of frappe 14 & later are cached, as older ones build into sites/assets"""
+	from bench.utils.app import get_current_version, get_major_version
+
+	if not get_asset_cache_dir(bench_path):
+		return False
+
+	try:
+		return get_major_version(get_current_version("frappe", bench_path)) >= 14
+	except Exception:
+		return False
+
+
+def get_toolchain_version(bench_path=".") -> str:
+	"""What besides an app's sources decides its built assets: frappe's build scripts
+	& node packages, node itself, and whether it's a production build"""
+	from bench.config.common_site_config import get_config
+	from bench.utils.app import get_assets_fingerprint
+
+	try:
+		node_version = get_cmd_output("node --version")
+	except Exception:
+		node_version = None
+
+	return "-".join(
+		[
+			get_assets_fingerprint("frappe", bench_path),
+			str(node_version),
+			"developer" if get_config(bench_path).get("developer_mode") else "production",
+		]
+	)
+
+
+def get_cache_key(app: str, fingerprint: str, toolchain: str) -> str:
+	return hashlib.sha256(f"{app}\0{fingerprint}\0{toolchain}".encode()).hexdigest()
+
+
+def get_dist_path(app: str, bench_path=".") -> str:
+	app_path = os.path.join(bench_path, "apps", app)
+	module_path = get_app_module_path(app_path) or os.path.join(app_path, app)
+	return os.path.join(module_path, "public", "dist")
+
+
+def get_manifest_entries(app: str, manifest: Dict) -> Dict:
+	"""Returns the entries of a manifest, like assets.json, for the app's bundles"""
+	prefix = f"/assets/{app}/"
+	return {
+		bundle: path
+		for bundle, path in manifest.items()
+		if isinstance(path, str) and path.startswith(prefix)
+	}
+
+
+def restore_assets(app: str, key: str, bench_path=".") -> bool:
+	"""Restores the app's built assets from the cache entry of key, if it has one"""
+	entry = os.path.join(get_asset_cache_dir(bench_path), key[:2], key)
+
+	if not os.path.exists(os.path.join(entry, "manifests.json")):
+		update_stats(bench_path, misses=1)
+		return False
+
+	dist_path = get_dist_path(app, bench_path)
+	shutil.rmtree(dist_path, ignore_errors=True)
+	copy_tree(os.path.join(entry, "dist"), dist_path)
+
+	manifests = read_json(os.path.join(entry, "manifests.json"), default={})
+	for name in ASSET_MANIFESTS:
+		path = os.path.join(bench_path, "sites", "assets", name)
+		manifest = read_json(path, default={})
+		# drop entries of the app's previous build, their files are gone
+		for bundle in get_manifest_entries(app, manifest):
+			del manifest[bundle]
+		manifest.update(manifests.get(name, {}))
+
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		write_json(path, manifest, indent=4)
+
+	link_assets(app, bench_path)
+
+	# the entry's mtime is when it was last used, for evicting the least used
+	os.utime(entry)
+	update_stats(bench_path, hits=1)
+	return True
+
+
+def link_assets(app: str, bench_path="."):
+	"""Links the app's public folder, and its node_modules, into sites/assets as the
+	build does, for benches whose assets are all restored, without a build"""
+	public_path = os.path.abspath(os.path.dirname(get_dist_path(app, bench_path)))
+	node_modules_path = os.path.abspath(os.path.join(bench_path, "apps", app, "node_modules"))
+	assets_link = os.path.join(bench_path, "sites", "assets", app)
+
+	if not os.path.lexists(assets_link):
+		os.makedirs(os.path.dirname(assets_link), exist_ok=True)
+		os.symlink(public_path, assets_link)
+
+	node_modules_link = os.path.join(public_path, "node_modules")
+	if os.path.isdir(node_modules_path) and not os.path.lexists(node_modules_link):
+		os.symlink(node_modules_path, node_modules_link)
+
+
+def store_assets(app: str, key: str, bench_path="."):
+	"""Copies the app's built assets into the cache entry of key"""
+	dist_path = get_dist_path(app, bench_path)
+	entry = os.path.join(get_asset_cache_dir(bench_path), key[:2], key)
+
+	if not os.path.isdir(dist_path) or os.path.exists(entry):
+		return
+
+	manifests = {
+		name: get_manifest_entries(
+			app, read_json(os.path.join(bench_path, "sites", "assets", name), default={})
+		)
+		for name in ASSET_MANIFESTS
+	}
+
+	# made aside and renamed in place, so a partial entry is never restored
+	tmp_entry = f"{entry}.tmp-{os.getpid()}"
+	shutil.rmtree(tmp_entry, ignore_errors=True)
+	copy_tree(dist_path, os.path.join(tmp_entry, "dist"))
+	write_json(os.path.join(tmp_entry, "manifests.json"), manifests)
+
+	try:
+		os.rename(tmp_entry, entry)
+	except OSError:
+		# another bench stored the same build meanwhile
+		shutil.rmtree(tmp_entry, ignore_errors=True)
+
+
+def get_entries(bench_path=".") -> List[Dict]:
+	"""Returns the cache's entries, the least recently used first"""
+	cache_dir = get_asset_cache_dir(bench_path)
+	entries = []
+
+	if not cache_dir or not os.path.isdir(cache_dir):
+		return entries
+
+	for prefix in os.listdir(cache_dir):
+		prefix_path = os.path.join(cache_dir, prefix)
+		if len(prefix) != 2 or not os.path.isdir(prefix_path):
+			continue
+
+		for key in os.listdir(prefix_path):
+			path = os.path.join(prefix_path, key)
+			if ".tmp-" in key:
+				continue
+
+			size = sum(
+				os.path.getsize(os.path.join(root, f))
+				for root, _, files in os.walk(path)
+				for f in files
+			)
+			entries.append({"path": path, "used_at": os.path.getmtime(path), "size": size})
+
+	return sorted(entries, key=lambda entry: entry["used_at"])
+
+
+def evict_assets(bench_path=".") -> List[str]:
+	"""Removes the entries not used for `asset_cache_max_age` days (default 30), then
+	the least recently used ones until the cache is under `asset_cache_max_size` MB
+	(default 2048). Returns the removed entries.
+	"""
+	from bench.config.common_site_config import get_config
+
+	config = get_config(bench_path)
+	max_age = config.get("asset_cache_max_age", 30) * 24 * 60 * 60
+	max_size = config.get("asset_cache_max_size", 2048) * 1024 * 1024
+
+	entries = get_entries(bench_path)
+	size = sum(entry["size"] for entry in entries)
+	evicted = []
+
+	for entry in entries:
+		if time.time() - entry["used_at"] < max_age and size <= max_size:
+			break
+		shutil.rmtree(entry["path"], ignore_errors=True)
+		size -= entry["size"]
+		evicted.append(entry["path"])
+
+	if evicted:
+		update_stats(bench_path, evictions=len(evicted))
+
+	return evicted
+
+
+def get_stats(bench_path=".") -> Dict:
+	stats = {"hits": 0, "misses": 0, "evictions": 0}
+	cache_dir = get_asset_cache_dir(bench_path)
+	if cache_dir:
+		stats.update(read_json(os.path.join(cache_dir, "stats.json"), default={}))
+	return stats
+
+
+def update_stats(bench_path=".", **counts):
+	cache_dir = get_asset_cache_dir(bench_path)
+
+	try:
+		with file_lock(os.path.join(cache_dir, "stats.lock")):
+			stats = get_stats(bench_path)
+			for name, count in counts.items():
+				stats[name] += count
+			write_json(os.path.join(cache_dir, "stats.json"), stats)
+	except OSError:
+		pass
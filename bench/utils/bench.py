@@ -9,6 +9,7 @@ import sys
 from functools import lru_cache
 from glob import glob
 from json.decoder import JSONDecodeError
+from typing import Dict, List, Union
 
 # imports - third party imports
 import click
@@ -16,7 +17,7 @@ import click
 # imports - module imports
 import bench
 from bench.exceptions import PatchError, ValidationError
-from bench.utils import exec_cmd, get_bench_name, get_cmd_output, log, which
+from bench.utils import disk_cache, exec_cmd, get_bench_name, get_cmd_output, log, which
 
 logger = logging.getLogger(bench.PROJECT_NAME)
 
@@ -25,6 +26,12 @@ logger = logging.getLogger(bench.PROJECT_NAME)
 def get_env_cmd(cmd: str, bench_path: str = ".") -> str:
 	# this supports envs' generated by patched virtualenv or venv (which may cause an extra 'local' folder to be created)
 
+	for env_bin in (("env", "bin"), ("env", "local", "bin")):
+		env_cmd = os.path.join(bench_path, *env_bin, cmd)
+		if os.path.exists(env_cmd):
+			# avoid walking the entire env in the usual case
+			return os.path.abspath(env_cmd)
+
 	existing_python_bins = glob(
 		os.path.join(bench_path, "env", "**", "bin", cmd), recursive=True
 	)
@@ -36,6 +43,114 @@ def get_env_cmd(cmd: str, bench_path: str = ".") -> str:
 	return os.path.abspath(os.path.join(bench_path, "env", "bin", cmd))
 
 
+def get_env_site_packages(bench_path: str = ".") -> List[str]:
+	site_packages = []
+
+	for pattern in (
+		("env", "lib", "python*", "site-packages"),
+		("env", "lib64", "python*", "site-packages"),
+		("env", "local", "lib", "python*", "site-packages"),
+	):
+		for path in sorted(glob(os.path.join(bench_path, *pattern))):
+			# lib64 is usually a symlink to lib
+			if os.path.realpath(path) not in map(os.path.realpath, site_packages):
+				site_packages.append(path)
+
+	return site_packages
+
+
+def normalize_package_name(name: str) -> str:
+	"""Normalizes distribution names as pip does, `Frappe_Bench` -> `frappe-bench`"""
+	return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def get_installed_distributions(bench_path: str = ".") -> Dict[str, Dict]:
+	"""Returns the distributions installed in the bench's env, keyed by their
+	normalized name, by reading the metadata in its site-packages.
+
+	Each distribution is described as {"name", "version", "editable", "url"},
+	`url` being the source it was installed from, if recorded. The result is
+	cached in config/installed_packages.json against the mtime of site-packages,
+	which changes whenever a distribution is installed, upgraded or removed.
+	"""
+	from bench.utils import get_mtime, read_json, write_json
+
+	site_packages = get_env_site_packages(bench_path)
+	key = [[os.path.abspath(path), get_mtime(path)] for path in site_packages]
+
+	cache_path = os.path.join(bench_path, "config", "installed_packages.json")
+	cache = read_json(cache_path, default={})
+	if cache.get("key") == key:
+		return cache["distributions"]
+
+	distributions = {}
+	for path in site_packages:
+		for entry in sorted(os.listdir(path)):
+			dist = read_distribution(os.path.join(path, entry))
+			if dist:
+				distributions.setdefault(normalize_package_name(dist["name"]), dist)
+
+	if site_packages:
+		with contextlib.suppress(OSError):
+			write_json(cache_path, {"key": key, "distributions": distributions})
+
+	return distributions
+
+
+def read_distribution(path: str) -> Union[Dict, None]:
+	"""Reads a site-packages entry's metadata: *.dist-info, *.egg-info or *.egg-link"""
+	if path.endswith(".dist-info"):
+		dist = read_dist_metadata(os.path.join(path, "METADATA"))
+		direct_url_path = os.path.join(path, "direct_url.json")
+
+		if dist and os.path.exists(direct_url_path):
+			with contextlib.suppress(OSError, ValueError):
+				with open(direct_url_path) as f:
+					direct_url = json.load(f)
+				dist["url"] = direct_url.get("url")
+				dist["editable"] = bool(direct_url.get("dir_info", {}).get("editable"))
+
+		return dist
+
+	if path.endswith(".egg-info"):
+		metadata = os.path.join(path, "PKG-INFO") if os.path.isdir(path) else path
+		return read_dist_metadata(metadata)
+
+	if path.endswith(".egg-link"):
+		# installed by `setup.py develop`, the first line points to the source
+		with contextlib.suppress(OSError):
+			with open(path) as f:
+				source = f.readline().strip()
+
+			dist = {
+				"name": os.path.basename(path)[: -len(".egg-link")],
+				"version": None,
+				"editable": True,
+				"url": f"file://{source}",
+			}
+			for egg_info in glob(os.path.join(source, "*.egg-info", "PKG-INFO")):
+				dist["version"] = (read_dist_metadata(egg_info) or {}).get("version")
+			return dist
+
+
+def read_dist_metadata(path: str) -> Union[Dict, None]:
+	dist = {"name": None, "version": None, "editable": False, "url": None}
+
+	try:
+		with open(path, encoding="utf-8", errors="replace") as f:
+			# Name and Version are in the headers, which end at the first blank line
+			for line in f:
+				if not line.strip():
+					break
+				header, _, value = line.partition(":")
+				if header in ("Name", "Version"):
+					dist[header.lower()] = value.strip()
+	except OSError:
+		return None
+
+	return dist if dist["name"] else None
+
+
 def get_venv_path(verbose=False, python="python3"):
 	with open(os.devnull, "wb") as devnull:
 		is_venv_installed = not subprocess.call(
@@ -66,6 +181,7 @@ def update_node_packages(bench_path=".", apps=None):
 def install_python_dev_dependencies(bench_path=".", apps=None, verbose=False):
 	import bench.cli
 	from bench.bench import Bench
+	from bench.utils.wheelhouse import pip_install
 
 	verbose = bench.cli.verbose or verbose
 	quiet_flag = "" if verbose else "--quiet"
@@ -78,20 +194,83 @@ def install_python_dev_dependencies(bench_path=".", apps=None, verbose=False):
 		apps = bench.get_installed_apps()
 
 	for app in apps:
-		pyproject_deps = None
-		app_path = os.path.join(bench_path, "apps", app)
-		pyproject_path = os.path.join(app_path, "pyproject.toml")
-		dev_requirements_path = os.path.join(app_path, "dev-requirements.txt")
+		dev_requirements = get_python_dev_requirements(app, bench_path=bench_path)
+		if dev_requirements:
+			pip_install(
+				f"{quiet_flag} --upgrade {dev_requirements}",
+				bench_path=bench_path,
+				python=bench.python,
+			)
 
-		if os.path.exists(pyproject_path):
-			pyproject_deps = _generate_dev_deps_pattern(pyproject_path)
-			if pyproject_deps:
-				bench.run(f"{bench.python} -m pip install {quiet_flag} --upgrade {pyproject_deps}")
 
-		if not pyproject_deps and os.path.exists(dev_requirements_path):
-			bench.run(
-				f"{bench.python} -m pip install {quiet_flag} --upgrade -r {dev_requirements_path}"
-			)
+def get_python_dev_requirements(app, bench_path=".") -> str:
+	"""Returns the pip arguments to install the app's development dependencies,
+	from its pyproject.toml or else, its dev-requirements.txt"""
+	app_path = os.path.join(bench_path, "apps", app)
+	pyproject_path = os.path.join(app_path, "pyproject.toml")
+	dev_requirements_path = os.path.join(app_path, "dev-requirements.txt")
+
+	if os.path.exists(pyproject_path):
+		pyproject_deps = _generate_dev_deps_pattern(pyproject_path)
+		if pyproject_deps:
+			return pyproject_deps.strip()
+
+	if os.path.exists(dev_requirements_path):
+		return f"-r {dev_requirements_path}"
+
+	return ""
+
+
+def install_python_apps(apps, bench_path=".", verbose=False):
+	"""Installs the apps, and their development dependencies in developer_mode,
+	with a single pip command. pip then resolves the env once for all apps,
+	instead of once per app.
+	"""
+	import bench.cli
+	from bench.bench import Bench
+	from bench.utils.wheelhouse import pip_install
+
+	verbose = bench.cli.verbose or verbose
+	quiet_flag = "" if verbose else "--quiet"
+
+	bench = Bench(bench_path)
+	requirements = [
+		f"-e {os.path.realpath(os.path.join(bench_path, 'apps', app))}" for app in apps
+	]
+
+	if bench.conf.get("developer_mode"):
+		for app in apps:
+			requirements.append(get_python_dev_requirements(app, bench_path=bench_path))
+
+	print(f"Installing python dependencies of {len(apps)} applications...")
+	pip_install(
+		f"{quiet_flag} --upgrade {' '.join(filter(None, requirements))}",
+		bench_path=bench_path,
+		python=bench.python,
+	)
+
+
+@disk_cache("pypi_versions")
+def get_latest_package_version(package: str) -> str:
+	import requests
+
+	res = requests.get(f"https://pypi.org/pypi/{package}/json", timeout=10)
+	res.raise_for_status()
+	return res.json()["info"]["version"]
+
+
+def is_package_current(package: str, bench_path=".") -> bool:
+	"""Checks if the package is installed in the bench's env, at its latest
+	version on PyPI. If PyPI can't be reached, it's assumed not to be."""
+	installed = get_installed_distributions(bench_path).get(normalize_package_name(package))
+
+	if not installed or not installed["version"]:
+		return False
+
+	try:
+		return installed["version"] == get_latest_package_version(package)
+	except Exception:
+		return False
 
 
 def _generate_dev_deps_pattern(pyproject_path):
@@ -123,11 +302,62 @@ def update_yarn_packages(bench_path=".", apps=None):
 		print("`npm install -g yarn`")
 		return
 
-	for app in apps:
-		app_path = os.path.join(apps_dir, app)
-		if os.path.exists(os.path.join(app_path, "package.json")):
-			click.secho(f"\nInstalling node dependencies for {app}", fg="yellow")
-			bench.run("yarn install", cwd=app_path)
+	from bench.utils import run_parallel
+
+	def install(app):
+		click.secho(f"\nInstalling node dependencies for {app}", fg="yellow")
+		yarn_install(os.path.join(apps_dir, app), bench_path=bench.name)
+
+	# the apps' node_modules are separate, so they're installed concurrently
+	_, errors = run_parallel(
+		install,
+		[app for app in apps if os.path.exists(os.path.join(apps_dir, app, "package.json"))],
+		bench_path=bench.name,
+	)
+	for error in errors.values():
+		raise error
+
+
+def get_yarn_cache_dir(bench_path=".") -> str:
+	"""Returns the yarn cache shared by the benches on the host, if enabled.
+
+	Set `yarn_cache` in common_site_config.json to a path, or to true to use the
+	per-user cache in ~/.cache/bench/yarn. Packages in it are installed from it
+	rather than downloaded again.
+	"""
+	from bench.utils import get_shared_cache_dir
+
+	return get_shared_cache_dir("yarn_cache", "yarn", bench_path)
+
+
+def yarn_install(app_path: str, bench_path="."):
+	"""Runs `yarn install` for the app at app_path, from the shared cache if enabled.
+	With the node_modules store enabled, the installed files are linked to it.
+
+	yarn 1 doesn't write to its cache safely from concurrent installs, of the apps
+	or of other benches, so installs are serialized by a mutex file in the cache.
+	"""
+	from bench.utils import get_cache_dir
+	from bench.utils.node_store import get_node_store_dir, link_node_modules, unlink_node_modules
+
+	yarn_cache = get_yarn_cache_dir(bench_path)
+	node_modules_path = os.path.join(app_path, "node_modules")
+	mutex_dir = yarn_cache or get_cache_dir()
+	os.makedirs(mutex_dir, exist_ok=True)
+
+	cmd = f"yarn install --mutex file:{os.path.join(mutex_dir, '.yarn-mutex')}"
+	if yarn_cache:
+		cmd += f" --prefer-offline --cache-folder {yarn_cache}"
+
+	# yarn & the packages' install scripts write into the files in place
+	unlink_node_modules(node_modules_path)
+
+	exec_cmd(cmd, cwd=app_path)
+
+	store = get_node_store_dir(bench_path)
+	if store:
+		linked = link_node_modules(node_modules_path, store)
+		log(f"Linked {linked['files']} files of {os.path.basename(app_path)}'s node_modules to the store")
 
 
 def update_npm_packages(bench_path=".", apps=None):
@@ -165,11 +395,16 @@ def update_npm_packages(bench_path=".", apps=None):
 	exec_cmd("npm install", cwd=bench_path)
 
 
-def migrate_env(python, backup=False):
+def migrate_env(python, backup=False, discard=False):
+	"""Replaces the bench's env by one of the given python, built next to it. The
+	previous env is kept as env.old, or in archived/envs with backup, so it can be
+	restored; with discard, it's removed.
+	"""
 	import shutil
 	from urllib.parse import urlparse
 
 	from bench.bench import Bench
+	from bench.utils.wheelhouse import pip_install
 
 	bench = Bench(".")
 	nvenv = "env"
@@ -186,7 +421,29 @@ def migrate_env(python, backup=False):
 		)
 		sys.exit(1)
 
-	# Clear Cache before Bench Dies.
+	# the new env is built next to the current one, which keeps working meanwhile
+	new_env = os.path.join(path, f"{nvenv}.migrating")
+	if os.path.exists(new_env):
+		shutil.rmtree(new_env)
+
+	try:
+		logger.log(f"Setting up a New Virtual {python} Environment")
+		exec_cmd(f"{python} -m venv {new_env}")
+
+		# all apps are installed with a single pip resolution
+		apps = ["frappe"] + [str(app) for app in bench.apps if str(app) != "frappe"]
+		pip_install(
+			"--upgrade " + " ".join(f"-e {os.path.join('apps', app)}" for app in apps),
+			python=os.path.join(new_env, "bin", "python"),
+			cwd=path,
+		)
+		relocate_env(new_env, new_env, pvenv)
+	except Exception:
+		logger.warning("Python env migration Error", exc_info=True)
+		shutil.rmtree(new_env, ignore_errors=True)
+		raise
+
+	# Clear Cache before the env is swapped.
 	try:
 		config = bench.conf
 		rredis = urlparse(config["redis_cache"])
@@ -199,42 +456,73 @@ def migrate_env(python, backup=False):
 	except Exception:
 		logger.warning("Please ensure Redis Connections are running or Daemonized.")
 
-	# Backup venv: restore using `virtualenv --relocatable` if needed
-	if backup:
-		from datetime import datetime
+	# the old env's scripts keep pointing to env/, so it can be restored by moving
+	# it back there
+	old_env = os.path.join(path, f"{nvenv}.old")
+	if os.path.exists(old_env):
+		shutil.rmtree(old_env)
 
-		parch = os.path.join(path, "archived", "envs")
-		os.makedirs(parch, exist_ok=True)
+	if os.path.exists(pvenv):
+		os.rename(pvenv, old_env)
+	os.rename(new_env, pvenv)
 
-		source = os.path.join(path, "env")
-		target = parch
+	if discard:
+		logger.log("Removing the previous Virtual Environment")
+		shutil.rmtree(old_env, ignore_errors=True)
+	elif os.path.exists(old_env):
+		if backup:
+			from datetime import datetime
 
-		logger.log("Backing up Virtual Environment")
-		stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-		dest = os.path.join(path, str(stamp))
+			parch = os.path.join(path, "archived", "envs")
+			os.makedirs(parch, exist_ok=True)
 
-		os.rename(source, dest)
-		shutil.move(dest, target)
+			logger.log("Backing up Virtual Environment")
+			stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+			shutil.move(old_env, os.path.join(parch, stamp))
+			old_env = os.path.join(parch, stamp)
 
-	# Create virtualenv using specified python
-	def _install_app(app):
-		app_path = f"-e {os.path.join('apps', app)}"
-		exec_cmd(f"{pvenv}/bin/python -m pip install --upgrade {app_path}")
+		click.secho(
+			f"The previous Virtual Environment is kept at {old_env}, restore it with:\n"
+			f"rm -rf {pvenv} && mv {old_env} {pvenv}",
+			fg="yellow",
+		)
 
-	try:
-		logger.log(f"Setting up a New Virtual {python} Environment")
-		exec_cmd(f"{python} -m venv {pvenv}")
+	logger.log(f"Migration Successful to {python}")
 
-		# Install frappe first
-		_install_app("frappe")
-		for app in bench.apps:
-			if str(app) != "frappe":
-				_install_app(app)
 
-		logger.log(f"Migration Successful to {python}")
-	except Exception:
-		logger.warning("Python env migration Error", exc_info=True)
-		raise
+def relocate_env(env_path: str, old_path: str, new_path: str):
+	"""Rewrites old_path to new_path in the paths a venv has recorded, so it works
+	once moved. They're in its scripts, like the shebangs of env/bin/* and the
+	activate scripts, and in site-packages, where the editable installs of the
+	apps point to their source.
+	"""
+	old_path, new_path = os.path.abspath(old_path), os.path.abspath(new_path)
+	# only whole path components, so /bench isn't rewritten in /bench2
+	pattern = re.compile(re.escape(old_path.encode()) + rb"(?=[/\"'\s:]|$)", re.M)
+
+	files = glob(os.path.join(env_path, "bin", "*")) + [os.path.join(env_path, "pyvenv.cfg")]
+	for site_packages in glob(os.path.join(env_path, "lib*", "python*", "site-packages")):
+		for pattern_ in ("*.pth", "*.egg-link", "__editable__*.py", "*.dist-info/direct_url.json"):
+			files.extend(glob(os.path.join(site_packages, pattern_)))
+
+	for path in files:
+		if os.path.islink(path) or not os.path.isfile(path):
+			continue
+
+		with open(path, "rb") as f:
+			content = f.read()
+
+		# skip binaries, only scripts have the venv's path
+		if b"\0" in content:
+			continue
+
+		relocated = pattern.sub(new_path.encode(), content)
+		if relocated != content:
+			stat = os.stat(path)
+			with open(path, "wb") as f:
+				f.write(relocated)
+			# what's installed didn't change, the fingerprints of the env mustn't either
+			os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
 
 
 def validate_upgrade(from_ver, to_ver, bench_path="."):
@@ -344,14 +632,90 @@ def restart_process_manager(bench_path=".", web_workers=False):
 		exec_cmd(f"overmind restart {worker}", cwd=bench_path)
 
 
-def build_assets(bench_path=".", app=None):
-	command = "bench build"
-	if app:
-		command += f" --app {app}"
-	exec_cmd(command, cwd=bench_path, env={"BENCH_DEVELOPER": "1"})
+def build_assets(bench_path=".", app=None, force=False):
+	"""Builds the assets of the app, or all apps, whose sources changed since they
+	were last built, going by the hashes recorded in sites/apps.json. Assets of all
+	apps are rebuilt if frappe's change, as the apps' bundles can import them.
+
+	Builds are restored from, and stored in, the asset cache shared by the benches
+	on the host, when the same sources were built with the same toolchain before.
+	"""
+	from bench.bench import Bench
+	from bench.utils import asset_cache
+	from bench.utils.app import get_assets_fingerprint, get_build_script
+
+	bench = Bench(bench_path)
+	all_apps = list(bench.apps)
+	apps = [app] if app else all_apps
+	assets_path = os.path.join(bench_path, "sites", "assets")
+	fingerprints = {app: get_assets_fingerprint(app, bench_path) for app in all_apps}
+
+	def is_changed(app):
+		recorded = bench.apps.states.get(app, {}).get("fingerprints", {}).get("assets")
+		return recorded != fingerprints[app] or not os.path.exists(
+			os.path.join(assets_path, app)
+		)
+
+	# all the apps asked for are built if frappe's sources changed
+	if not force and os.path.exists(os.path.join(assets_path, "assets.json")):
+		if not ("frappe" in fingerprints and is_changed("frappe")):
+			apps = [app for app in apps if is_changed(app)]
+
+	if not apps:
+		log("Sources of the assets haven't changed since they were built, skipping build")
+		return
+
+	built_apps = apps
+	use_cache = asset_cache.is_asset_cache_enabled(bench_path)
+
+	if use_cache:
+		toolchain = asset_cache.get_toolchain_version(bench_path)
+		keys = {
+			app: asset_cache.get_cache_key(app, fingerprints[app], toolchain)
+			for app in apps
+			# apps' own build scripts write outside the cached public/dist
+			if not get_build_script(app, bench_path)
+		}
+		restored = [
+			app
+			for app in apps
+			if app in keys and asset_cache.restore_assets(app, keys[app], bench_path)
+		]
+		if restored:
+			log(f"Restored assets of {', '.join(restored)} from the asset cache")
+		apps = [app for app in apps if app not in restored]
+
+	if apps:
+		run_build(apps, build_all=set(apps) == set(all_apps), bench_path=bench_path)
+
+	if use_cache:
+		for app in apps:
+			if app in keys:
+				asset_cache.store_assets(app, keys[app], bench_path)
+		asset_cache.evict_assets(bench_path)
+
+	for app in built_apps:
+		# builds that write into the sources, like a frontend's into public, change them
+		fingerprint = get_assets_fingerprint(app, bench_path) if app in apps else fingerprints[app]
+		bench.apps.update_fingerprints(app, assets=fingerprint)
+
+
+def run_build(apps, build_all=False, bench_path="."):
+	from bench.utils.app import get_current_version, get_major_version
+
+	env = {"BENCH_DEVELOPER": "1"}
+
+	if build_all:
+		exec_cmd("bench build", cwd=bench_path, env=env)
+	elif get_major_version(get_current_version("frappe", bench_path)) >= 14:
+		exec_cmd(f"bench build --apps {','.join(apps)}", cwd=bench_path, env=env)
+	else:
+		for app in apps:
+			exec_cmd(f"bench build --app {app}", cwd=bench_path, env=env)
 
 
 def handle_version_upgrade(version_upgrade, bench_path, force, reset, conf):
+	from bench.bench import Bench
 	from bench.utils import log, pause_exec
 
 	if version_upgrade[0]:
@@ -368,14 +732,15 @@ This would take significant time to migrate and might break custom apps."""
 			)
 			click.confirm("Do you want to continue?", abort=True)
 
-	if not reset and conf.get("shallow_clone"):
+	if not reset and Bench(bench_path).clone_strategy == "shallow":
 		log(
-			"""shallow_clone is set in your bench config.
-However without passing the --reset flag, your repositories will be unshallowed.
+			"""Apps are shallow cloned as set in your bench config.
+However without passing the --reset flag, your repositories will be unshallowed,
+fetching their history without file contents (a blobless partial clone).
 To avoid this, cancel this operation and run `bench update --reset`.
 
 Consider the consequences of `git reset --hard` on your apps before you run that.
-To avoid seeing this warning, set shallow_clone to false in your common_site_config.json
+To avoid seeing this warning, set clone_strategy to blobless or full in your common_site_config.json
 		""",
 			level=3,
 		)
@@ -397,21 +762,26 @@ def update(
 	reset: bool = False,
 	restart_supervisor: bool = False,
 	restart_systemd: bool = False,
+	dry_run: bool = False,
 ):
-	"""command: bench update"""
+	"""command: bench update
+
+	The steps of the update are run as a graph of tasks, each as soon as the ones
+	it depends on are done. With dry_run, the graph is printed instead.
+	"""
 	import re
 
 	from bench import patches
-	from bench.app import pull_apps
+	from bench.app import get_update_plan
 	from bench.bench import Bench
 	from bench.config.common_site_config import update_config
 	from bench.exceptions import CannotUpdateReleaseBench
 	from bench.utils.app import is_version_upgrade
-	from bench.utils.system import backup_all_sites
 
 	bench_path = os.path.abspath(".")
 	bench = Bench(bench_path)
-	patches.run(bench_path=bench_path)
+	if not dry_run:
+		patches.run(bench_path=bench_path)
 	conf = bench.conf
 
 	if conf.get("release_bench"):
@@ -425,81 +795,269 @@ def update(
 	else:
 		apps = []
 
-	validate_branch()
+	# filled in as the update goes, for the tasks of the graph
+	state = {"plan": {}, "pulled": {}, "version_upgrade": (False, None, None)}
+
+	# every app's upstream is fetched once, for all the steps below
+	plan_apps = [app for app in (apps or bench.apps) if app not in bench.excluded_apps]
+	if not pull:
+		plan_apps = []
+	if "frappe" not in plan_apps:
+		plan_apps.insert(0, "frappe")
+
+	graph = get_update_graph(
+		apps,
+		pull=pull,
+		patch=patch,
+		build=build,
+		requirements=requirements,
+		backup=backup,
+		compile=compile,
+		force=force,
+		reset=reset,
+		restart_supervisor=restart_supervisor,
+		restart_systemd=restart_systemd,
+		bench_path=bench_path,
+		state=state,
+	)
+
+	if dry_run:
+		print(graph.format())
+		return
 
-	version_upgrade = is_version_upgrade()
+	print("Fetching updates...")
+	state["plan"] = plan = get_update_plan(plan_apps, bench_path=bench_path, reset=reset)
+
+	validate_branch(plan=plan)
+
+	state["version_upgrade"] = version_upgrade = is_version_upgrade(plan=plan)
 	handle_version_upgrade(version_upgrade, bench_path, force, reset, conf)
 
 	conf.update({"maintenance_mode": 1, "pause_scheduler": 1})
 	update_config(conf, bench_path=bench_path)
 
+	graph.run(bench_path=bench_path)
+
+	conf.update({"maintenance_mode": 0, "pause_scheduler": 0})
+	update_config(conf, bench_path=bench_path)
+
+	print(
+		"_" * 80 + "\nBench: Deployment tool for Frappe and Frappe Applications"
+		" (https://frappe.io/bench).\nOpen source depends on your contributions, so do"
+		" give back by submitting bug reports, patches and fixes and be a part of the"
+		" community :)"
+	)
+
+
+def get_update_graph(
+	apps,
+	pull=True,
+	patch=True,
+	build=True,
+	requirements=True,
+	backup=True,
+	compile=True,
+	force=False,
+	reset=False,
+	restart_supervisor=False,
+	restart_systemd=False,
+	bench_path=".",
+	state=None,
+):
+	"""Returns the steps of `bench update` as a TaskGraph. The apps' node dependencies
+	are installed concurrently, each once its app is pulled, and overlap with the
+	backup, which only the python dependencies & migrations wait for. Assets are built
+	together, as frappe's changes rebuild all apps, alongside the migrations.
+
+	state holds the update plan & version upgrade, known once the updates are fetched,
+	and the commits pulled, known once the pull task is done.
+	"""
+	from bench.app import pull_apps
+	from bench.bench import Bench
+	from bench.utils.app import get_dependency_fingerprints
+	from bench.utils.system import backup_all_sites
+	from bench.utils.task_graph import TaskGraph
+
+	bench = Bench(bench_path)
+	graph = TaskGraph()
+	state = state if state is not None else {"plan": {}, "pulled": {}}
+
 	if backup:
-		print("Backing up sites...")
-		backup_all_sites(bench_path=bench_path)
+		graph.add("backup", lambda: backup_all_sites(bench_path=bench_path), title="Back up sites")
 
 	if pull:
-		print("Updating apps source...")
-		pull_apps(apps=apps, bench_path=bench_path, reset=reset)
+
+		def pull_task():
+			state["pulled"] = pull_apps(
+				apps=apps, bench_path=bench_path, reset=reset, plan=state["plan"]
+			)
+
+		graph.add("pull", pull_task, title="Pull apps")
 
 	if requirements:
-		print("Setting up requirements...")
-		bench.setup.requirements()
+		graph.add(
+			"python",
+			lambda: bench.setup.requirements(force=force, node=False),
+			after=["pull", "backup"],
+			title="Install python dependencies",
+		)
+
+		def install_node_dependencies(app):
+			app_path = os.path.join(bench_path, "apps", app)
+			if not os.path.exists(os.path.join(app_path, "package.json")):
+				return
+
+			if not force and not bench.apps.get_changed_dependencies(app, "node"):
+				log(f"Node dependencies of {app} are unchanged, skipping", no_log=True)
+				return
+
+			yarn_install(app_path, bench_path=bench_path)
+			bench.apps.update_fingerprints(
+				app, node=get_dependency_fingerprints(app, bench_path)["node"]
+			)
+
+		for app in bench.apps:
+			graph.add(
+				f"node:{app}",
+				# bind app now, not when the task runs
+				lambda app=app: install_node_dependencies(app),
+				after=["pull"],
+				title=f"Install node dependencies of {app}",
+			)
+
+	node_tasks = [name for name in graph.tasks if name.startswith("node:")]
 
 	if patch:
-		print("Patching sites...")
-		patch_sites(bench_path=bench_path)
+		graph.add(
+			"migrate",
+			lambda: patch_sites(bench_path=bench_path),
+			after=["pull", "backup", "python"],
+			title="Migrate sites",
+		)
 
 	if build:
-		print("Building assets...")
-		bench.build()
-
-	if version_upgrade[0] or (not version_upgrade[0] and force):
-		post_upgrade(version_upgrade[1], version_upgrade[2], bench_path=bench_path)
+		graph.add(
+			"build", bench.build, after=["pull", "python", *node_tasks], title="Build assets"
+		)
 
 	if pull and compile:
-		from compileall import compile_dir
+		graph.add(
+			"compile",
+			lambda: compile_pulled_apps(state["pulled"], bench_path=bench_path),
+			after=["pull"],
+			title="Compile python files",
+		)
 
-		print("Compiling Python files...")
-		apps_dir = os.path.join(bench_path, "apps")
-		compile_dir(apps_dir, quiet=1, rx=re.compile(".*node_modules.*"))
+	def post_upgrade_task():
+		version_upgrade = state.get("version_upgrade") or (False, None, None)
+		if version_upgrade[0] or force:
+			post_upgrade(version_upgrade[1], version_upgrade[2], bench_path=bench_path)
 
-	bench.reload(web=False, supervisor=restart_supervisor, systemd=restart_systemd)
+	graph.add(
+		"post-upgrade",
+		post_upgrade_task,
+		after=["migrate", "build"],
+		title="Regenerate configs after a major upgrade",
+	)
+	graph.add(
+		"restart",
+		lambda: bench.reload(web=False, supervisor=restart_supervisor, systemd=restart_systemd),
+		after=list(graph.tasks),
+		title="Restart bench processes",
+	)
 
-	conf.update({"maintenance_mode": 0, "pause_scheduler": 0})
-	update_config(conf, bench_path=bench_path)
+	return graph
 
-	print(
-		"_" * 80 + "\nBench: Deployment tool for Frappe and Frappe Applications"
-		" (https://frappe.io/bench).\nOpen source depends on your contributions, so do"
-		" give back by submitting bug reports, patches and fixes and be a part of the"
-		" community :)"
-	)
 
+def compile_pulled_apps(pulled, bench_path="."):
+	"""Byte-compiles the python files changed by pulling apps, pulled being
+	{app: (previous commit, new commit)} as returned by pull_apps"""
+	from bench.utils.app import get_changed_python_files
+
+	files = []
+
+	for app, (previous_commit, new_commit) in pulled.items():
+		if previous_commit == new_commit:
+			continue
+
+		changed, _ = get_changed_python_files(
+			app, previous_commit, new_commit, bench_path=bench_path
+		)
+		files.extend(
+			os.path.abspath(os.path.join(bench_path, "apps", app, path))
+			for path in changed
+			if "node_modules" not in path
+		)
+
+	compile_python_files(files, bench_path=bench_path)
+
+
+def compile_python_files(files: List[str], bench_path="."):
+	"""Byte-compiles files with the env's python, which may differ from bench's,
+	split across as many processes as there are CPUs.
+
+	Set `pyc_invalidation_mode` in common_site_config.json to `checked-hash` to
+	have the .pyc files validated by the source's hash rather than its mtime,
+	which git checkouts & resets change.
+	"""
+	from bench.bench import Bench
+	from bench.utils import run_parallel
+
+	files = [path for path in files if os.path.exists(path)]
+	if not files:
+		return
+
+	bench = Bench(bench_path)
+	cmd = [bench.python, "-m", "compileall", "-q", "-i", "-"]
+
+	invalidation_mode = bench.conf.get("pyc_invalidation_mode")
+	if invalidation_mode in ("timestamp", "checked-hash", "unchecked-hash"):
+		cmd += ["--invalidation-mode", invalidation_mode]
 
-def clone_apps_from(bench_path, clone_from, update_app=True):
+	processes = min(os.cpu_count() or 1, len(files))
+	chunks = {i: files[i::processes] for i in range(processes)}
+
+	def compile_chunk(i):
+		# files that can't be compiled are reported, as compile_dir did, but don't fail
+		subprocess.run(cmd, input="\n".join(chunks[i]), universal_newlines=True)
+
+	run_parallel(compile_chunk, chunks, max_workers=processes, bench_path=bench_path)
+
+
+def clone_apps_from(bench_path, clone_from, update_app=True, clone_env=False):
+	"""Copies the apps, and node_modules, of the bench at clone_from, updates and
+	installs them. With clone_env, the python env is copied too, so the apps'
+	python dependencies are only installed if they changed in the update.
+
+	Assets aren't built, as the apps' builds can't run concurrently; they're to be
+	built once for all apps, like `bench init` does.
+	"""
 	from bench.app import install_app
+	from bench.utils import run_parallel
+	from bench.utils.app import get_dependency_fingerprints
 
 	print(f"Copying apps from {clone_from}...")
-	subprocess.check_output(["cp", "-R", os.path.join(clone_from, "apps"), bench_path])
+	copy_tree(os.path.join(clone_from, "apps"), os.path.join(bench_path, "apps"))
 
 	node_modules_path = os.path.join(clone_from, "node_modules")
 	if os.path.exists(node_modules_path):
 		print(f"Copying node_modules from {clone_from}...")
-		subprocess.check_output(["cp", "-R", node_modules_path, bench_path])
+		copy_tree(node_modules_path, os.path.join(bench_path, "node_modules"))
 
 	def setup_app(app):
 		# run git reset --hard in each branch, pull latest updates and install_app
 		app_path = os.path.join(bench_path, "apps", app)
+		fingerprints = get_dependency_fingerprints(app, bench_path)
 
 		# remove .egg-ino
 		subprocess.check_output(["rm", "-rf", app + ".egg-info"], cwd=app_path)
 
 		if update_app and os.path.exists(os.path.join(app_path, ".git")):
 			remotes = subprocess.check_output(["git", "remote"], cwd=app_path).strip().split()
-			if "upstream" in remotes:
+			if b"upstream" in remotes:
 				remote = "upstream"
 			else:
-				remote = remotes[0]
+				remote = remotes[0].decode()
 			print(f"Cleaning up {app}")
 			branch = subprocess.check_output(
 				["git", "rev-parse", "--abbrev-ref", "HEAD"], cwd=app_path
@@ -507,13 +1065,96 @@ def clone_apps_from(bench_path, clone_from, update_app=True):
 			subprocess.check_output(["git", "reset", "--hard"], cwd=app_path)
 			subprocess.check_output(["git", "pull", "--rebase", remote, branch], cwd=app_path)
 
-		install_app(app, bench_path, restart_bench=False)
+		# the copied env has the app installed, unless the update changed its dependencies
+		skip_python = (
+			clone_env
+			and get_dependency_fingerprints(app, bench_path)["python"] == fingerprints["python"]
+		)
+		install_app(
+			app,
+			bench_path=bench_path,
+			restart_bench=False,
+			skip_assets=True,
+			skip_python=skip_python,
+		)
 
 	with open(os.path.join(clone_from, "sites", "apps.txt")) as f:
 		apps = f.read().splitlines()
 
-	for app in apps:
-		setup_app(app)
+	# frappe is set up first, as installing the other apps needs it
+	if "frappe" in apps:
+		setup_app("frappe")
+
+	_, errors = run_parallel(
+		setup_app, [app for app in apps if app != "frappe"], bench_path=bench_path
+	)
+	for error in errors.values():
+		raise error
+
+
+def clone_env_from(bench_path, clone_from):
+	"""Copies the python env of the bench at clone_from, relocating it to bench_path"""
+	print(f"Copying env from {clone_from}...")
+	env_path = os.path.join(bench_path, "env")
+	copy_tree(os.path.join(clone_from, "env"), env_path)
+	relocate_env(env_path, clone_from, bench_path)
+
+
+def copy_tree(source, destination):
+	"""Copies the directory source to destination. Where the filesystem supports
+	it, files are reflinked, sharing their data until either copy changes them.
+	Otherwise they're copied concurrently, with git's objects, which never change,
+	hardlinked.
+	"""
+	import shutil
+
+	from bench.utils import run_parallel
+
+	os.makedirs(destination, exist_ok=True)
+
+	# GNU cp clones the files on btrfs, xfs and the like, and fails elsewhere
+	if not subprocess.call(
+		[
+			"cp",
+			"-R",
+			"--reflink=always",
+			"--preserve=mode,timestamps",
+			os.path.join(source, "."),
+			destination,
+		],
+		stdout=subprocess.DEVNULL,
+		stderr=subprocess.DEVNULL,
+	):
+		return
+
+	files = []
+	for root, dirs, filenames in os.walk(source):
+		relative_root = os.path.relpath(root, source)
+		os.makedirs(os.path.join(destination, relative_root), exist_ok=True)
+
+		# os.walk doesn't follow links to directories, they're copied as links
+		filenames += [d for d in dirs if os.path.islink(os.path.join(root, d))]
+		files.extend(os.path.normpath(os.path.join(relative_root, f)) for f in filenames)
+
+	def copy(relative_path):
+		src, dst = os.path.join(source, relative_path), os.path.join(destination, relative_path)
+
+		if os.path.lexists(dst):
+			os.remove(dst)
+
+		if os.path.islink(src):
+			os.symlink(os.readlink(src), dst)
+			return
+
+		if f"{os.sep}.git{os.sep}objects{os.sep}" in f"{os.sep}{relative_path}":
+			with contextlib.suppress(OSError):
+				return os.link(src, dst)
+
+		shutil.copy2(src, dst)
+
+	_, errors = run_parallel(copy, files)
+	for error in errors.values():
+		raise error
 
 
 def remove_backups_crontab(bench_path="."):
@@ -608,18 +1249,19 @@ def check_app_installed_legacy(app, bench_path="."):
 				sys.exit(1)
 
 
-def validate_branch():
+def validate_branch(plan=None):
 	from bench.bench import Bench
 	from bench.utils.app import get_current_branch
 
 	apps = Bench(".").apps
+	plan = plan or {}
 
 	installed_apps = set(apps)
 	check_apps = {"frappe", "erpnext"}
 	intersection_apps = installed_apps.intersection(check_apps)
 
 	for app in intersection_apps:
-		branch = get_current_branch(app)
+		branch = plan.get(app, {}).get("branch") or get_current_branch(app)
 
 		if branch == "master":
 			print(
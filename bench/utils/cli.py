@@ -15,6 +15,11 @@ def print_bench_version(ctx, param, value):
 
 
 class MultiCommandGroup(click.Group):
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		# command name -> "module:attribute" of commands that aren't imported yet
+		self.lazy_commands = {}
+
 	def add_command(self, cmd, name=None):
 		"""Registers another :class:`Command` with this group.  If the name
 		is not provided, the name of the command is used.
@@ -34,6 +39,31 @@ class MultiCommandGroup(click.Group):
 				for _name in name:
 					self.commands[_name] = cmd
 
+	def add_lazy_command(self, import_path: str, name):
+		"""Registers a command by name without importing it. `import_path` is of
+		the form "module:attribute" and is imported only when the command is looked
+		up, ie when it's invoked or listed in the help.
+
+		Like `add_command`, name may be a list of names for the command.
+		"""
+		for _name in name if isinstance(name, list) else [name]:
+			self.lazy_commands[_name] = import_path
+
+	def has_command(self, name: str) -> bool:
+		return name in self.commands or name in self.lazy_commands
+
+	def list_commands(self, ctx):
+		return sorted(set(self.commands) | set(self.lazy_commands))
+
+	def get_command(self, ctx, cmd_name):
+		if cmd_name not in self.commands and cmd_name in self.lazy_commands:
+			from importlib import import_module
+
+			module, attribute = self.lazy_commands[cmd_name].split(":")
+			self.commands[cmd_name] = getattr(import_module(module), attribute)
+
+		return super().get_command(ctx, cmd_name)
+
 
 class SugaredOption(click.Option):
 	def __init__(self, *args, **kwargs):
@@ -0,0 +1,336 @@
+"""Resident helper process that keeps frappe imported for a bench.
+
+Forwarding a command to frappe (`bench --site x migrate`) normally starts the env's
+Python and imports frappe & every app's commands from scratch. When the helper is
+running, the bench CLI instead connects to config/bench_helper.sock and passes its
+argv, environment and stdin/stdout/stderr file descriptors over. The helper forks a
+worker per request which runs the command writing directly to the client's streams,
+and reports back the exit code.
+
+The server half of this module is executed by the bench env's Python as a script:
+	env/bin/python bench/utils/daemon.py /path/to/bench
+so it must only depend on the standard library.
+"""
+
+# imports - standard imports
+import array
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import threading
+
+SOCKET_NAME = "bench_helper.sock"
+STATE_NAME = "bench_helper.json"
+STD_FDS = (0, 1, 2)
+# commands that take over the terminal are always exec'd
+INTERACTIVE_COMMANDS = {"console", "db-console", "mariadb", "postgres", "jupyter"}
+# as are the processes run by the process manager, which has to own & signal them
+LONG_RUNNING_COMMANDS = {"worker", "schedule", "serve", "watch"}
+# signals the client gets are passed on to the worker, which isn't its child
+RELAYED_SIGNALS = (signal.SIGTERM, signal.SIGHUP, signal.SIGQUIT)
+
+
+def get_socket_path(bench_path="."):
+	return os.path.join(bench_path, "config", SOCKET_NAME)
+
+
+def get_state_path(bench_path="."):
+	return os.path.join(bench_path, "config", "pids", STATE_NAME)
+
+
+# client
+
+
+def forward_to_helper(argv, bench_path="."):
+	"""Runs `frappe.utils.bench_helper <argv>` in the bench's resident helper.
+
+	Returns the command's exit code, or None if the helper isn't running or is
+	stale, in which case the caller is expected to run the command itself.
+	"""
+	socket_path = get_socket_path(bench_path)
+
+	exec_commands = INTERACTIVE_COMMANDS | LONG_RUNNING_COMMANDS
+
+	if not os.path.exists(socket_path) or exec_commands.intersection(argv):
+		return None
+
+	if not is_helper_current(bench_path):
+		return None
+
+	client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	try:
+		client.connect(socket_path)
+		request = json.dumps(
+			{
+				"argv": list(argv),
+				"cwd": os.path.abspath(os.path.join(bench_path, "sites")),
+				"env": dict(os.environ),
+			}
+		).encode()
+		client.sendmsg(
+			[struct.pack("!I", len(request)) + request],
+			[(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", STD_FDS))],
+		)
+	except OSError:
+		client.close()
+		return None
+
+	with client, client.makefile("r") as responses:
+		return wait_for_exit_code(responses)
+
+
+def wait_for_exit_code(responses):
+	worker = {"pid": None, "pending": []}
+
+	def relay(signum, frame=None):
+		if worker["pid"]:
+			os.kill(worker["pid"], signum)
+		else:
+			# sent on once the worker reports its pid
+			worker["pending"].append(signum)
+
+	previous_handlers = {}
+	if threading.current_thread() is threading.main_thread():
+		for signum in RELAYED_SIGNALS:
+			previous_handlers[signum] = signal.signal(signum, relay)
+
+	try:
+		while True:
+			try:
+				line = responses.readline()
+			except KeyboardInterrupt:
+				# the worker isn't attached to our terminal, relay the interrupt
+				relay(signal.SIGINT)
+				continue
+
+			if not line:
+				# worker died without reporting back
+				return 1
+
+			response = json.loads(line)
+			if "exit_code" in response:
+				return response["exit_code"]
+
+			worker["pid"] = response.get("pid")
+			while worker["pid"] and worker["pending"]:
+				relay(worker["pending"].pop(0))
+	finally:
+		for signum, handler in previous_handlers.items():
+			signal.signal(signum, handler)
+
+
+def is_helper_current(bench_path="."):
+	"""Helper is usable only while the env & apps it imported are unchanged"""
+	from bench.utils import get_frappe_cmd_cache_key, read_json
+
+	state = read_json(get_state_path(bench_path), default={})
+	return state.get("key") == get_frappe_cmd_cache_key(bench_path=bench_path)
+
+
+def get_helper_pid(bench_path="."):
+	from bench.utils import read_json
+
+	pid = read_json(get_state_path(bench_path), default={}).get("pid")
+
+	try:
+		os.kill(pid, 0)
+	except (OSError, TypeError):
+		return None
+
+	return pid
+
+
+def start_helper(bench_path=".", timeout=60):
+	import subprocess
+	import time
+
+	from bench.exceptions import CommandFailedError
+	from bench.utils import get_frappe_cmd_cache_key, write_json
+	from bench.utils.bench import get_env_cmd
+
+	if get_helper_pid(bench_path):
+		stop_helper(bench_path)
+
+	bench_path = os.path.abspath(bench_path)
+	socket_path = get_socket_path(bench_path)
+	python = get_env_cmd("python", bench_path=bench_path)
+
+	with open(os.path.join(bench_path, "logs", "bench_helper.log"), "a") as log_file:
+		helper = subprocess.Popen(
+			[python, os.path.abspath(__file__), bench_path],
+			cwd=bench_path,
+			stdin=subprocess.DEVNULL,
+			stdout=log_file,
+			stderr=subprocess.STDOUT,
+			start_new_session=True,
+		)
+
+	write_json(
+		get_state_path(bench_path),
+		{"pid": helper.pid, "key": get_frappe_cmd_cache_key(bench_path=bench_path)},
+	)
+
+	# frappe and the apps' commands are imported before the socket is bound
+	for _ in range(timeout * 10):
+		if os.path.exists(socket_path):
+			return helper.pid
+		if helper.poll() is not None:
+			break
+		time.sleep(0.1)
+
+	stop_helper(bench_path)
+	raise CommandFailedError(
+		"Bench helper failed to start. Check logs/bench_helper.log for details"
+	)
+
+
+def stop_helper(bench_path="."):
+	pid = get_helper_pid(bench_path)
+
+	if pid:
+		os.kill(pid, signal.SIGTERM)
+
+	for path in (get_state_path(bench_path), get_socket_path(bench_path)):
+		if os.path.exists(path):
+			os.remove(path)
+
+	return pid
+
+
+# server
+
+
+def serve(bench_path):
+	# don't let modules in bench/utils shadow top level ones, like `cli` or `app`
+	if sys.path and sys.path[0] == os.path.dirname(os.path.abspath(__file__)):
+		sys.path.pop(0)
+
+	os.chdir(bench_path)
+	sites_path = os.path.abspath("sites")
+
+	os.chdir(sites_path)
+	import frappe.utils.bench_helper as bench_helper
+
+	if hasattr(bench_helper, "get_app_groups"):
+		# imports the commands of all installed apps
+		bench_helper.get_app_groups()
+
+	os.chdir(bench_path)
+	socket_path = get_socket_path()
+	if os.path.exists(socket_path):
+		os.remove(socket_path)
+
+	server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	umask = os.umask(0o077)
+	server.bind(socket_path)
+	os.umask(umask)
+	server.listen(64)
+
+	signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+	# forked workers are reaped by the kernel
+	signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+	print(f"Bench helper listening on {os.path.abspath(socket_path)}", flush=True)
+
+	try:
+		while True:
+			conn, _ = server.accept()
+
+			if not is_same_user(conn):
+				conn.close()
+				continue
+
+			if os.fork() == 0:
+				server.close()
+				signal.signal(signal.SIGTERM, signal.SIG_DFL)
+				signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+				run_worker(conn, bench_helper)
+
+			conn.close()
+	finally:
+		if os.path.exists(socket_path):
+			os.remove(socket_path)
+
+
+def is_same_user(conn):
+	if not hasattr(socket, "SO_PEERCRED"):
+		# the socket's 0600 permissions still apply
+		return True
+
+	creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+	_pid, uid, _gid = struct.unpack("3i", creds)
+	return uid == os.getuid()
+
+
+def receive_request(conn):
+	fds = array.array("i")
+	data, ancdata, _flags, _addr = conn.recvmsg(
+		65536, socket.CMSG_SPACE(len(STD_FDS) * fds.itemsize)
+	)
+
+	for level, kind, cmsg_data in ancdata:
+		if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+			fds.frombytes(cmsg_data[: len(cmsg_data) - (len(cmsg_data) % fds.itemsize)])
+
+	(length,) = struct.unpack("!I", data[:4])
+	data = data[4:]
+
+	while len(data) < length:
+		chunk = conn.recv(length - len(data))
+		if not chunk:
+			raise ConnectionError("Incomplete request")
+		data += chunk
+
+	return json.loads(data), list(fds)
+
+
+def run_worker(conn, bench_helper):
+	exit_code = 1
+
+	try:
+		request, fds = receive_request(conn)
+
+		sys.stdout.flush()
+		sys.stderr.flush()
+		for target, fd in zip(STD_FDS, fds):
+			os.dup2(fd, target)
+			os.close(fd)
+
+		# stream output as it's written, like an interactive run would
+		sys.stdin = open(0, closefd=False)
+		sys.stdout = open(1, "w", buffering=1, closefd=False)
+		sys.stderr = open(2, "w", buffering=1, closefd=False)
+
+		os.environ.clear()
+		os.environ.update(request["env"])
+		os.chdir(request["cwd"])
+		conn.sendall(json.dumps({"pid": os.getpid()}).encode() + b"\n")
+
+		sys.argv = [bench_helper.__file__] + request["argv"]
+		bench_helper.main()
+		exit_code = 0
+
+	except SystemExit as e:
+		if isinstance(e.code, str):
+			sys.stderr.write(f"{e.code}\n")
+		exit_code = e.code if isinstance(e.code, int) else int(e.code is not None)
+
+	except Exception:
+		import traceback
+
+		traceback.print_exc()
+
+	finally:
+		try:
+			sys.stdout.flush()
+			sys.stderr.flush()
+			conn.sendall(json.dumps({"exit_code": exit_code}).encode() + b"\n")
+		except Exception:
+			pass
+		os._exit(exit_code)
+
+
+if __name__ == "__main__":
+	serve(sys.argv[1])
@@ -0,0 +1,102 @@
+# imports - standard imports
+import os
+import shutil
+
+# imports - module imports
+from bench.utils import (
+	exec_cmd,
+	file_lock,
+	get_cmd_output,
+	get_shared_cache_dir,
+	is_git_url,
+	log,
+)
+
+# mirrors fetched by this process, so each is updated at most once per command
+updated_mirrors = set()
+
+# only branches & tags are mirrored, not the likes of refs/pull/* which apps are never
+# cloned from, but which can make up most of a mirror
+MIRROR_REFSPECS = ("+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*")
+
+
+def get_mirror_dir(bench_path=".") -> str:
+	"""Returns the directory holding bare mirrors of app repos, if enabled.
+
+	Set `git_mirror` in common_site_config.json to a path, which may be shared by
+	several benches, or to true to use the per-user mirror in ~/.cache/bench/git.
+	"""
+	return get_shared_cache_dir("git_mirror", "git", bench_path)
+
+
+def get_mirror_path(url: str, mirror_dir: str) -> str:
+	"""Path of the repo's mirror, eg: <mirror_dir>/github.com/frappe/frappe.git"""
+	if "://" in url:
+		path = url.split("://", 1)[1]
+	else:
+		# scp-like syntax: git@github.com:frappe/frappe.git
+		path = url.replace(":", "/", 1)
+
+	host, _, path = path.partition("/")
+	host = host.rsplit("@", 1)[-1].split(":")[0]
+	path = path.strip("/")
+
+	if not path.endswith(".git"):
+		path += ".git"
+
+	parts = [part for part in path.split("/") if part not in ("", ".", "..")]
+	return os.path.join(os.path.abspath(mirror_dir), host, *parts)
+
+
+def set_mirror_refspecs(mirror_path: str):
+	"""Sets the mirror to fetch MIRROR_REFSPECS only. Mirrors made with `git clone
+	--mirror` fetch every ref, so they're switched over, dropping the other refs.
+	"""
+	if get_cmd_output("git config --get remote.origin.mirror", cwd=mirror_path, _raise=False):
+		get_cmd_output("git config --unset remote.origin.mirror", cwd=mirror_path)
+		get_cmd_output(
+			"git for-each-ref --format='delete %(refname)' "
+			"| grep -v -e ' refs/heads/' -e ' refs/tags/' | git update-ref --stdin",
+			cwd=mirror_path,
+		)
+
+	get_cmd_output(
+		f"git config --replace-all remote.origin.fetch '{MIRROR_REFSPECS[0]}'", cwd=mirror_path
+	)
+	for refspec in MIRROR_REFSPECS[1:]:
+		get_cmd_output(f"git config --add remote.origin.fetch '{refspec}'", cwd=mirror_path)
+
+
+def update_mirror(url: str, bench_path=".") -> str:
+	"""Clones or fetches the mirror for url, once per process.
+
+	Returns the mirror's path, or None if mirrors aren't enabled or url isn't a
+	remote repo. If the mirror exists but can't be fetched, like when offline,
+	it's used as it is.
+	"""
+	mirror_dir = get_mirror_dir(bench_path)
+
+	if not mirror_dir or not is_git_url(url):
+		return None
+
+	mirror_path = get_mirror_path(url, mirror_dir)
+
+	if mirror_path in updated_mirrors:
+		return mirror_path
+
+	# updates to a mirror shared between benches are serialized
+	with file_lock(f"{mirror_path}.lock"):
+		if not os.path.exists(mirror_path):
+			# bare clones fetch branches & tags only, and keep the remote's default branch
+			if exec_cmd(f"git clone --bare --quiet {url} {mirror_path}", _raise=False):
+				shutil.rmtree(mirror_path, ignore_errors=True)
+				return None
+			set_mirror_refspecs(mirror_path)
+		else:
+			set_mirror_refspecs(mirror_path)
+
+			if exec_cmd("git fetch --prune --quiet origin", cwd=mirror_path, _raise=False):
+				log(f"Couldn't update mirror of {url}, using it as it is", level=3)
+
+	updated_mirrors.add(mirror_path)
+	return mirror_path
@@ -0,0 +1,149 @@
+# imports - standard imports
+import errno
+import hashlib
+import os
+import shutil
+import stat
+from typing import Dict, List
+
+# imports - module imports
+from bench.utils import get_shared_cache_dir, log
+
+
+def get_node_store_dir(bench_path=".") -> str:
+	"""Returns the store of node packages' files shared by the benches on the host, if
+	enabled.
+
+	Set `node_modules_store` in common_site_config.json to a path, or to true to use
+	the per-user store in ~/.cache/bench/node_modules. It has to be on the same
+	filesystem as the benches, as the apps' node_modules are hardlinked to it.
+	"""
+	store = get_shared_cache_dir("node_modules_store", "node_modules", bench_path)
+
+	if store:
+		os.makedirs(os.path.join(store, "objects"), exist_ok=True)
+
+	return store
+
+
+def get_object_path(store: str, path: str, executable: bool) -> str:
+	"""Files are stored by their contents, and whether they're executable, as linked
+	files share their mode too"""
+	sha = hashlib.sha256(b"x" if executable else b"-")
+
+	with open(path, "rb") as f:
+		for chunk in iter(lambda: f.read(1024 * 1024), b""):
+			sha.update(chunk)
+
+	digest = sha.hexdigest()
+	return os.path.join(store, "objects", digest[:2], digest)
+
+
+def link_node_modules(node_modules_path: str, store: str) -> Dict:
+	"""Replaces the files in node_modules_path by hardlinks to the same files in the
+	store, adding those it doesn't have. Files already linked are left as they are.
+
+	Linked files are shared by every app linked to the store, contents & mode, so
+	the links have to be broken with unlink_node_modules before anything writes to
+	node_modules, like yarn, which rewrites files in place.
+	"""
+	linked = {"files": 0, "size": 0}
+
+	for root, _, filenames in os.walk(node_modules_path):
+		for filename in filenames:
+			path = os.path.join(root, filename)
+			st = os.lstat(path)
+
+			if not stat.S_ISREG(st.st_mode) or st.st_nlink > 1 or ".tmp-" in filename:
+				continue
+
+			object_path = get_object_path(store, path, bool(st.st_mode & stat.S_IXUSR))
+			os.makedirs(os.path.dirname(object_path), exist_ok=True)
+
+			try:
+				# the first of its kind becomes the stored file
+				os.link(path, object_path)
+				continue
+			except FileExistsError:
+				pass
+			except OSError as e:
+				if e.errno != errno.EXDEV:
+					raise
+				log(f"The node_modules store {store} isn't on the same filesystem as the bench", level=3)
+				return linked
+
+			# linked aside and renamed in place, so the file is never missing
+			tmp_path = f"{path}.tmp-{os.getpid()}"
+			os.link(object_path, tmp_path)
+			os.replace(tmp_path, path)
+
+			linked["files"] += 1
+			linked["size"] += st.st_size
+
+	return linked
+
+
+def unlink_node_modules(node_modules_path: str) -> int:
+	"""Gives each file in node_modules_path that's linked to the store a copy of its
+	own, so what's written into it doesn't change the store, and the node_modules of
+	other apps & benches with it. Returns the number of files copied.
+	"""
+	copied = 0
+
+	for root, _, filenames in os.walk(node_modules_path):
+		for filename in filenames:
+			path = os.path.join(root, filename)
+			st = os.lstat(path)
+
+			if not stat.S_ISREG(st.st_mode) or st.st_nlink < 2:
+				continue
+
+			# copied aside and renamed in place, so the file is never missing
+			tmp_path = f"{path}.tmp-{os.getpid()}"
+			shutil.copy2(path, tmp_path)
+			os.replace(tmp_path, path)
+			copied += 1
+
+	return copied
+
+
+def get_objects(store: str) -> List[Dict]:
+	objects_dir = os.path.join(store, "objects")
+	objects = []
+
+	if not os.path.isdir(objects_dir):
+		return objects
+
+	for root, _, filenames in os.walk(objects_dir):
+		for filename in filenames:
+			path = os.path.join(root, filename)
+			st = os.stat(path)
+			objects.append({"path": path, "size": st.st_size, "links": st.st_nlink - 1})
+
+	return objects
+
+
+def get_store_stats(store: str) -> Dict:
+	"""Returns the size of the store, and the space it saves: each file linked from n
+	node_modules would otherwise be stored n times"""
+	objects = get_objects(store)
+
+	return {
+		"files": len(objects),
+		"size": sum(o["size"] for o in objects),
+		"links": sum(o["links"] for o in objects),
+		"saved": sum(o["size"] * (o["links"] - 1) for o in objects if o["links"] > 1),
+		"unused": sum(1 for o in objects if not o["links"]),
+	}
+
+
+def prune_node_store(store: str) -> List[str]:
+	"""Removes the files no node_modules links to anymore. Returns the removed files."""
+	removed = []
+
+	for obj in get_objects(store):
+		if not obj["links"]:
+			os.remove(obj["path"])
+			removed.append(obj["path"])
+
+	return removed
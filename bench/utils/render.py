@@ -1,5 +1,6 @@
 # imports - standard imports
 import sys
+import threading
 from io import StringIO
 
 # imports - third party imports
@@ -7,6 +8,10 @@ import click
 
 # imports - module imports
 import bench
+from bench.utils import thread_local
+
+# steps run in threads, by run_parallel, render one at a time
+render_lock = threading.RLock()
 
 
 class Capturing(list):
@@ -56,16 +61,16 @@ class Rendering:
 		_prefix = click.style("⏼", fg="bright_yellow")
 		_hierarchy = "" if self.is_parent else "  "
 		self._title = self.title.format(**self.kw)
-		click.secho(f"{_hierarchy}{_prefix} {self._title}")
+		self._entry = {
+			"message": self._title,
+			"prefix": _prefix,
+			"color": None,
+			"is_parent": self.is_parent,
+		}
 
-		bench.LOG_BUFFER.append(
-			{
-				"message": self._title,
-				"prefix": _prefix,
-				"color": None,
-				"is_parent": self.is_parent,
-			}
-		)
+		with render_lock:
+			click.secho(f"{_hierarchy}{self.output_prefix}{_prefix} {self._title}")
+			bench.LOG_BUFFER.append(self._entry)
 
 	def __exit__(self, *args, **kwargs):
 		if not self.dynamic_feed:
@@ -74,15 +79,26 @@ class Rendering:
 		self._prefix = click.style("✔", fg="green")
 		self._success = self.success.format(**self.kw)
 
-		self.render_screen()
+		with render_lock:
+			self._entry["prefix"] = self._prefix
+			self._entry["message"] = self._success
+
+			if self.output_prefix:
+				# redrawing the screen would wipe the output of the other threads' steps
+				_hierarchy = "" if self.is_parent else "  "
+				click.secho(f"{_hierarchy}{self.output_prefix}{self._prefix} {self._success}")
+			else:
+				self.render_screen()
+
+	@property
+	def output_prefix(self):
+		"""Set while the step runs in a thread of run_parallel"""
+		return getattr(thread_local, "output_prefix", "")
 
 	def render_screen(self):
 		click.clear()
 
 		for l in bench.LOG_BUFFER:
-			if l["message"] == self._title:
-				l["prefix"] = self._prefix
-				l["message"] = self._success
 			_hierarchy = "" if l.get("is_parent") else "  "
 			click.secho(f'{_hierarchy}{l["prefix"]} {l["message"]}', fg=l["color"])
 
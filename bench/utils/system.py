@@ -16,7 +16,8 @@ from bench.utils import (
 	which,
 	is_valid_frappe_branch,
 )
-from bench.utils.bench import build_assets, clone_apps_from
+from bench.exceptions import ValidationError
+from bench.utils.bench import build_assets, clone_apps_from, clone_env_from
 from bench.utils.render import job
 
 
@@ -35,6 +36,9 @@ def init(
 	skip_assets=False,
 	python="python3",
 	install_app=None,
+	git_mirror=None,
+	clone_env=False,
+	template=None,
 ):
 	"""Initialize a new bench directory
 
@@ -62,20 +66,36 @@ def init(
 
 	bench.setup.dirs()
 	bench.setup.logging()
-	bench.setup.env(python=python)
+
+	if template:
+		template = init_from_template(template, path, python=python, frappe_branch=frappe_branch)
+	elif clone_from and clone_env:
+		clone_env_from(bench_path=path, clone_from=clone_from)
+	else:
+		bench.setup.env(python=python)
 	bench.setup.config(redis=not skip_redis_config_generation, procfile=not no_procfile)
 	bench.setup.patches()
 
-	# local apps
-	if clone_from:
+	if git_mirror:
+		from bench.config.common_site_config import update_config
+
+		update_config({"git_mirror": os.path.abspath(git_mirror)}, bench_path=path)
+
+	# local apps, unless copied with the template
+	if clone_from and not template:
 		clone_apps_from(
-			bench_path=path, clone_from=clone_from, update_app=not clone_without_update
+			bench_path=path,
+			clone_from=clone_from,
+			update_app=not clone_without_update,
+			clone_env=clone_env,
 		)
 
 	# remote apps
-	else:
+	elif not template:
 		frappe_path = frappe_path or "https://github.com/frappe/frappe.git"
-		is_valid_frappe_branch(frappe_path=frappe_path, frappe_branch=frappe_branch)
+		if not git_mirror:
+			# with a mirror, the clone itself validates the branch & works offline
+			is_valid_frappe_branch(frappe_path=frappe_path, frappe_branch=frappe_branch)
 		get_app(
 			frappe_path,
 			branch=frappe_branch,
@@ -100,13 +120,42 @@ def init(
 			resolve_deps=False,
 		)
 
-	if not skip_assets:
+	if not skip_assets and not (template and template["has_assets"] and not install_app):
 		build_assets(bench_path=path)
 
 	if not no_backups:
 		bench.setup.backups()
 
 
+def init_from_template(name, path, python="python3", frappe_branch=None):
+	"""Sets up the bench at path from the template, instead of cloning & installing
+	its apps. The template's env is used if it's of the python version asked for,
+	otherwise a new env is made and the apps installed into it.
+	"""
+	from bench.bench import Bench
+	from bench.utils.template import get_python_version, get_template, use_template
+
+	template = get_template(name)
+
+	if frappe_branch and frappe_branch != template["frappe_branch"]:
+		raise ValidationError(
+			f"Template {name} is of frappe branch {template['frappe_branch']}, not {frappe_branch}"
+		)
+
+	use_template(template, path)
+	template["has_assets"] = os.path.exists(os.path.join(path, "sites", "assets"))
+
+	if get_python_version(which(python, raise_err=True)) != template["python_version"]:
+		log(f"Template {name} is of python {template['python_version']}, making a new env")
+		shutil.rmtree(os.path.join(path, "env"), ignore_errors=True)
+
+		bench = Bench(path)
+		bench.setup.env(python=python)
+		bench.setup.requirements(force=True)
+
+	return template
+
+
 def setup_sudoers(user):
 	from bench.config.lets_encrypt import get_certbot_path
 
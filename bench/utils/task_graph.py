@@ -0,0 +1,107 @@
+# imports - standard imports
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List
+
+# imports - module imports
+from bench.utils import get_max_workers, log, thread_local
+
+
+class TaskGraph:
+	"""Tasks, and the tasks each has to run after. Tasks are run as soon as those
+	they depend on are done, concurrently with the others.
+
+	graph = TaskGraph()
+	graph.add("pull", pull_apps)
+	graph.add("build", build_assets, after=["pull"])
+	graph.run()
+	"""
+
+	def __init__(self):
+		self.tasks = OrderedDict()
+
+	def add(self, name: str, func: Callable, after: Iterable[str] = (), title: str = None):
+		"""Adds the task, to run after those in `after` that are in the graph. Tasks
+		have to be added after the ones they depend on, so the graph can't have cycles.
+		"""
+		self.tasks[name] = {
+			"func": func,
+			"after": [dep for dep in after if dep in self.tasks],
+			"title": title or name,
+		}
+		return name
+
+	def __contains__(self, name):
+		return name in self.tasks
+
+	@property
+	def levels(self) -> List[List[str]]:
+		"""Groups the tasks by how many have to run, one after another, before them"""
+		depths = {}
+		for name, task in self.tasks.items():
+			depths[name] = max((depths[dep] + 1 for dep in task["after"]), default=0)
+
+		levels = [[] for _ in range(max(depths.values(), default=-1) + 1)]
+		for name, depth in depths.items():
+			levels[depth].append(name)
+
+		return levels
+
+	def format(self) -> str:
+		lines = []
+		for i, level in enumerate(self.levels, start=1):
+			for name in level:
+				after = self.tasks[name]["after"]
+				after = f" (after {', '.join(after)})" if after else ""
+				lines.append(f"{i}. {self.tasks[name]['title']}{after}")
+
+		return "\n".join(lines)
+
+	def run(self, max_workers=None, bench_path=".") -> Dict:
+		"""Runs the tasks, at most max_workers at once. If a task fails, the tasks after
+		it are skipped while the others run on, and its exception is raised once they're
+		done. Returns the tasks' results, by name.
+		"""
+		from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+		def run_task(name):
+			thread_local.output_prefix = f"[{name}] "
+			try:
+				return self.tasks[name]["func"]()
+			finally:
+				thread_local.output_prefix = ""
+
+		pending = OrderedDict(self.tasks)
+		running, results, errors, skipped = {}, {}, OrderedDict(), []
+		max_workers = max_workers or get_max_workers(bench_path)
+
+		with ThreadPoolExecutor(max_workers=max_workers) as executor:
+			while pending or running:
+				# tasks are in the order they were added, so after the ones they depend on
+				for name, task in list(pending.items()):
+					if any(dep in errors or dep in skipped for dep in task["after"]):
+						skipped.append(name)
+					elif all(dep in results for dep in task["after"]):
+						running[executor.submit(run_task, name)] = name
+					else:
+						continue
+					del pending[name]
+
+				if not running:
+					break
+
+				done, _ = wait(running, return_when=FIRST_COMPLETED)
+				for future in done:
+					name = running.pop(future)
+					try:
+						results[name] = future.result()
+					except Exception as e:
+						errors[name] = e
+
+		if skipped:
+			log(f"Skipped {', '.join(skipped)}, as tasks they depend on failed", level=2)
+
+		for name, error in errors.items():
+			log(f"{self.tasks[name]['title']} failed", level=2)
+			raise error
+
+		return results
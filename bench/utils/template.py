@@ -0,0 +1,139 @@
+# imports - standard imports
+import os
+import re
+import shutil
+import time
+from glob import glob
+from typing import Dict, List
+
+# imports - module imports
+from bench.exceptions import ValidationError
+from bench.utils import get_cache_dir, get_cmd_output, log, read_json, write_json
+from bench.utils.bench import copy_tree, relocate_env
+
+# parts of an initialized bench that don't depend on where it is, or on its sites
+TEMPLATE_PATHS = ("apps", "env", "node_modules", os.path.join("sites", "assets"))
+TEMPLATE_FILES = (os.path.join("sites", "apps.txt"), os.path.join("sites", "apps.json"))
+
+
+def get_templates_dir() -> str:
+	return get_cache_dir("templates")
+
+
+def get_python_version(python: str) -> str:
+	return get_cmd_output(
+		f"{python} -c \"import sys; print('{{}}.{{}}'.format(*sys.version_info[:2]))\""
+	)
+
+
+def get_template_name(frappe_branch: str, python_version: str) -> str:
+	"""Templates are named after what decides their contents, eg: version-15-py3.11"""
+	return re.sub(r"[^\w.-]+", "-", f"{frappe_branch}-py{python_version}")
+
+
+def get_template(name: str) -> Dict:
+	"""Returns the template's details as recorded in its template.json, with its path"""
+	path = os.path.join(get_templates_dir(), name)
+	template = read_json(os.path.join(path, "template.json"), default=None)
+
+	if not template:
+		raise ValidationError(f"Template {name} doesn't exist, create it with `bench template create`")
+
+	template["path"] = path
+	return template
+
+
+def get_templates() -> List[Dict]:
+	templates_dir = get_templates_dir()
+
+	if not os.path.isdir(templates_dir):
+		return []
+
+	return [
+		get_template(name)
+		for name in sorted(os.listdir(templates_dir))
+		if os.path.exists(os.path.join(templates_dir, name, "template.json"))
+	]
+
+
+def create_template(bench_path=".", name=None) -> Dict:
+	"""Records the apps, env, node_modules & built assets of the bench as a template,
+	which `bench init --template` copies instead of setting up a bench from scratch.
+	"""
+	from bench.utils.app import get_current_branch
+	from bench.utils.bench import get_env_cmd
+
+	bench_path = os.path.abspath(bench_path)
+	template = {
+		"frappe_branch": get_current_branch("frappe", bench_path=bench_path),
+		"python_version": get_python_version(get_env_cmd("python", bench_path=bench_path)),
+		"source": bench_path,
+		"created_at": time.time(),
+	}
+	name = name or get_template_name(template["frappe_branch"], template["python_version"])
+	path = os.path.join(get_templates_dir(), name)
+
+	# built aside and renamed in place, so a bench is never created from half a template
+	tmp_path = f"{path}.tmp"
+	shutil.rmtree(tmp_path, ignore_errors=True)
+	os.makedirs(tmp_path)
+
+	# the paths in the template point to where it's renamed to, not to tmp_path
+	copy_bench(bench_path, tmp_path, relocate_to=path)
+	write_json(os.path.join(tmp_path, "template.json"), template)
+
+	shutil.rmtree(path, ignore_errors=True)
+	os.rename(tmp_path, path)
+
+	template["path"] = path
+	return template
+
+
+def use_template(template: Dict, bench_path: str):
+	"""Copies the template into the bench at bench_path, rewriting its paths"""
+	log(f"Copying template {os.path.basename(template['path'])}...")
+	copy_bench(template["path"], bench_path)
+
+
+def copy_bench(source: str, destination: str, relocate_to: str = None):
+	"""Copies the bench independent parts of a bench, or template, with copy-on-write
+	where the filesystem supports it, and points their paths to destination, or to
+	relocate_to if the copy is moved there afterwards"""
+	source, destination = os.path.abspath(source), os.path.abspath(destination)
+	relocate_to = os.path.abspath(relocate_to or destination)
+
+	for path in TEMPLATE_PATHS:
+		if os.path.exists(os.path.join(source, path)):
+			copy_tree(os.path.join(source, path), os.path.join(destination, path))
+
+	for path in TEMPLATE_FILES:
+		if os.path.exists(os.path.join(source, path)):
+			os.makedirs(os.path.dirname(os.path.join(destination, path)), exist_ok=True)
+			shutil.copy2(os.path.join(source, path), os.path.join(destination, path))
+
+	if os.path.exists(os.path.join(destination, "env")):
+		relocate_env(os.path.join(destination, "env"), source, relocate_to)
+
+	relocate_links(os.path.join(destination, "sites", "assets"), source, relocate_to)
+
+	# like public/node_modules, linked to the app's node_modules
+	for public_path in glob(os.path.join(destination, "apps", "*", "*", "public")):
+		relocate_links(public_path, source, relocate_to)
+
+
+def relocate_links(directory: str, old_path: str, new_path: str):
+	"""Points the symlinks in directory, like those of assets to the apps' public
+	folders, from under old_path to new_path. Linked directories aren't walked."""
+	if not os.path.isdir(directory):
+		return
+
+	for root, dirs, files in os.walk(directory):
+		for name in dirs + files:
+			link = os.path.join(root, name)
+			if not os.path.islink(link):
+				continue
+
+			target = os.readlink(link)
+			if target == old_path or target.startswith(old_path + os.sep):
+				os.remove(link)
+				os.symlink(new_path + target[len(old_path) :], link)
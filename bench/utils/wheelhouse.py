@@ -0,0 +1,145 @@
+# imports - standard imports
+import os
+import shlex
+import subprocess
+import tempfile
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# imports - module imports
+from bench.utils import exec_cmd, get_shared_cache_dir
+from bench.utils.bench import get_env_cmd, normalize_package_name
+
+# pip install options that pip wheel doesn't take
+INSTALL_ONLY_OPTIONS = ("--upgrade", "-U", "--force-reinstall", "--user")
+
+
+def get_wheelhouse_dir(bench_path=".") -> str:
+	"""Returns the directory of wheels shared by the benches on the host, if enabled.
+
+	Set `wheelhouse` in common_site_config.json to a path, or to true to use the
+	per-user wheelhouse in ~/.cache/bench/wheels. Wheels are named after the
+	interpreter, ABI and platform they're built for, so pip only picks the ones
+	that suit the env it's installing into.
+	"""
+	return get_shared_cache_dir("wheelhouse", "wheels", bench_path)
+
+
+def parse_wheel_name(filename: str) -> Dict:
+	"""Splits `{name}-{version}(-{build})?-{python}-{abi}-{platform}.whl`"""
+	parts = filename[: -len(".whl")].split("-")
+	return {
+		"name": normalize_package_name(parts[0]),
+		"version": parts[1],
+		"tags": "-".join(parts[-3:]),
+	}
+
+
+def pip_install(args: str, bench_path=".", python=None, cwd=None):
+	"""Runs `pip install {args}` in the bench's env, using the wheelhouse if enabled.
+
+	Requirements, upgrades too, are first installed from the wheelhouse alone, which
+	needs no network or builds. If some aren't in it, they're downloaded or built
+	with pip wheel, added to the wheelhouse and installed from there.
+	"""
+	python = python or get_env_cmd("python", bench_path=bench_path)
+	wheelhouse = get_wheelhouse_dir(bench_path)
+	cwd = cwd or bench_path
+
+	if not wheelhouse:
+		return exec_cmd(f"{python} -m pip install {args}", cwd=cwd)
+
+	find_links = f"--find-links {shlex.quote(wheelhouse)}"
+	offline = subprocess.run(
+		f"{python} -m pip install --quiet --no-index {find_links} {args}",
+		cwd=cwd,
+		shell=True,
+		stdout=subprocess.DEVNULL,
+		stderr=subprocess.DEVNULL,
+	)
+	if not offline.returncode:
+		return
+
+	wheel_args = [arg for arg in shlex.split(args) if arg not in INSTALL_ONLY_OPTIONS]
+	local_projects, build_requirements = get_local_projects(args, cwd)
+	# so the apps can be built in isolation, without the index, next time
+	wheel_args.extend(build_requirements)
+
+	with tempfile.TemporaryDirectory(prefix=".tmp-", dir=wheelhouse) as wheel_dir:
+		# requirements that can't be downloaded or built can't be installed either
+		exec_cmd(
+			f"{python} -m pip wheel {find_links} --wheel-dir {wheel_dir}"
+			f" {' '.join(shlex.quote(arg) for arg in wheel_args)}",
+			cwd=cwd,
+		)
+		add_to_wheelhouse(wheel_dir, wheelhouse, exclude=local_projects)
+
+	# the wheelhouse has all the requirements now, so they aren't resolved online again
+	return exec_cmd(f"{python} -m pip install --no-index {find_links} {args}", cwd=cwd)
+
+
+def get_local_projects(args: str, cwd: str) -> Tuple[List[str], List[str]]:
+	"""Returns the names of the projects installed from paths, like the apps, and
+	the requirements to build them. The projects change as they're developed, so
+	aren't kept in the wheelhouse, but their build requirements are.
+	"""
+	projects, build_requirements = [], []
+
+	for arg in shlex.split(args):
+		path = os.path.join(cwd, arg)
+		if arg.startswith("-") or not os.path.isdir(path):
+			continue
+
+		projects.append(normalize_package_name(os.path.basename(os.path.realpath(path))))
+
+		for requirement in get_build_requirements(path):
+			if requirement not in build_requirements:
+				build_requirements.append(requirement)
+
+	return projects, build_requirements
+
+
+def get_build_requirements(path: str) -> List[str]:
+	"""Returns the build-system requirements of the project at path, which default
+	to setuptools & wheel"""
+	try:
+		from tomli import load
+	except ImportError:
+		from tomllib import load
+
+	try:
+		with open(os.path.join(path, "pyproject.toml"), "rb") as f:
+			return load(f)["build-system"]["requires"]
+	except (OSError, KeyError, ValueError):
+		return ["setuptools>=40.8.0", "wheel"]
+
+
+def add_to_wheelhouse(wheel_dir: str, wheelhouse: str, exclude=()):
+	for filename in os.listdir(wheel_dir):
+		if not filename.endswith(".whl") or parse_wheel_name(filename)["name"] in exclude:
+			continue
+
+		target = os.path.join(wheelhouse, filename)
+		if not os.path.exists(target):
+			# the rename is atomic, so other benches never see a partial wheel
+			os.replace(os.path.join(wheel_dir, filename), target)
+
+
+def prune_wheelhouse(wheelhouse: str, keep: int = 1) -> List[str]:
+	"""Removes all but the `keep` latest added versions of each project, for each
+	interpreter & platform. Returns the removed wheels."""
+	wheels = defaultdict(list)
+
+	for filename in os.listdir(wheelhouse):
+		if filename.endswith(".whl"):
+			wheel = parse_wheel_name(filename)
+			path = os.path.join(wheelhouse, filename)
+			wheels[(wheel["name"], wheel["tags"])].append((os.path.getmtime(path), path))
+
+	removed = []
+	for versions in wheels.values():
+		for _, path in sorted(versions, reverse=True)[keep:]:
+			os.remove(path)
+			removed.append(path)
+
+	return removed